@@ -2,6 +2,132 @@ import gurobipy as gp
 from gurobipy import GRB
 import time
 import numpy as np
+import scipy.sparse as sp
+
+from candidates import (EdgePricer, all_edges, candidate_edges, edge_keys, incidence_matrix, nearest_neighbor_tour,
+                        tour_edges)
+from local_search import LocalSearch
+from progress import make_trace
+from subtour import connected_components, greedy_edge_tour, tour_from_edges, tour_arcs
+
+# 有可行解时可以提取回路的求解状态（INTERRUPTED为收到停止请求后调用terminate()）
+FEASIBLE_STATUSES = (GRB.OPTIMAL, GRB.TIME_LIMIT, GRB.INTERRUPTED)
+
+
+def _callback(model, where):
+    """统一回调入口：按模型上的标记分别执行进度记录、DFJ子回路分离和回路启发式"""
+    if model._trace is not None:
+        _record_progress(model, where)
+    if model._dfj:
+        _subtour_callback(model, where)
+    if model._heuristic is not None:
+        _heuristic_callback(model, where)
+
+
+def _record_progress(model, where):
+    """在MIP和MIPSOL回调中记录当前最好解、界和节点数，收到停止请求时终止求解"""
+    if where == GRB.Callback.MIP:
+        incumbent = model.cbGet(GRB.Callback.MIP_OBJBST)
+        model._trace.record(incumbent=incumbent if incumbent < GRB.INFINITY else None,
+                            bound=model.cbGet(GRB.Callback.MIP_OBJBND),
+                            nodes=model.cbGet(GRB.Callback.MIP_NODCNT))
+    elif where == GRB.Callback.MIPSOL:
+        incumbent = model.cbGet(GRB.Callback.MIPSOL_OBJBST)
+        model._trace.record(incumbent=incumbent if incumbent < GRB.INFINITY else None,
+                            bound=model.cbGet(GRB.Callback.MIPSOL_OBJBND),
+                            nodes=model.cbGet(GRB.Callback.MIPSOL_NODCNT))
+    if model._trace.stopped():
+        model.terminate()
+
+
+def _subtour_expr(model, component):
+    """子回路约束左端：两端点都在component内的边变量之和"""
+    inside = np.zeros(model._n, dtype=bool)
+    inside[component] = True
+    index = np.flatnonzero(inside[model._edges[:, 0]] & inside[model._edges[:, 1]])
+    return gp.LinExpr([1.0] * index.shape[0], [model._vars[k] for k in index])
+
+
+def _subtour_callback(model, where):
+    """DFJ子回路消除回调：整数解上添加惰性约束，分数解上分离子回路割"""
+    if where == GRB.Callback.MIPSOL:
+        values = np.array(model.cbGetSolution(model._vars))
+        for component in connected_components(model._n, model._edges[values > 0.5]):
+            if len(component) < model._n:
+                model.cbLazy(_subtour_expr(model, component) <= len(component) - 1)
+    elif where == GRB.Callback.MIPNODE:
+        if model.cbGet(GRB.Callback.MIPNODE_STATUS) != GRB.OPTIMAL:
+            return
+        values = np.array(model.cbGetNodeRel(model._vars))
+        components = connected_components(model._n, model._edges[values > 1e-6])
+        if len(components) > 1:
+            for component in components:
+                model.cbCut(_subtour_expr(model, component) <= len(component) - 1)
+
+
+def _heuristic_callback(model, where):
+    """在整数解（DFJ模型中可能含子回路）和每隔若干节点的LP松弛解上运行回路启发式"""
+    heuristic = model._heuristic
+    if where == GRB.Callback.MIPSOL:
+        values = np.array(model.cbGetSolution(heuristic.variables))
+        incumbent = model.cbGet(GRB.Callback.MIPSOL_OBJBST)
+    elif where == GRB.Callback.MIPNODE:
+        if model.cbGet(GRB.Callback.MIPNODE_STATUS) != GRB.OPTIMAL:
+            return
+        nodes = model.cbGet(GRB.Callback.MIPNODE_NODCNT)
+        if nodes < heuristic.last_node + heuristic.node_interval:
+            return
+        heuristic.last_node = nodes
+        values = np.array(model.cbGetNodeRel(heuristic.variables))
+        incumbent = model.cbGet(GRB.Callback.MIPNODE_OBJBST)
+    else:
+        return
+    heuristic.run(model, values, incumbent)
+
+
+def _tour_indicator(edges, tour, n):
+    """无向边集中属于回路的边取1，其余取0"""
+    return np.isin(edge_keys(edges, n), edge_keys(tour_edges([tour]), n)).astype(float)
+
+
+def _mtz_values(tour, rows, cols, n):
+    """回路对应的MTZ模型变量取值：弧变量及按访问次序取值的u"""
+    arcs, order = tour_arcs(tour)
+    successor = np.empty(n, dtype=int)
+    for i, j in arcs:
+        successor[i] = j
+    return (successor[rows] == cols).astype(float), np.array([order[i] for i in range(n)], dtype=float)
+
+
+class TourHeuristic:
+    """回调中的回路启发式：按变量取值贪心选边构造回路，经2-opt/Or-opt改进后优于当前最好解时注入Gurobi
+
+    edges与variables一一对应（MTZ模型中为有向弧），encode把回路转换为(变量列表, 取值列表)。
+    """
+
+    def __init__(self, dist_matrix, n, edges, variables, encode, node_interval=10):
+        self.dist_matrix = dist_matrix
+        self.n = n
+        self.edges = edges
+        self.variables = variables
+        self.encode = encode
+        self.node_interval = node_interval
+        self.local_search = LocalSearch(dist_matrix)
+        self.last_node = -node_interval
+        self.best = np.inf
+        self.solutions = 0
+
+    def run(self, model, values, incumbent):
+        """由变量取值构造并改进回路，优于当前最好解时通过cbSetSolution提交"""
+        support = values > 1e-6
+        tour = greedy_edge_tour(self.n, self.edges[support], values[support], self.dist_matrix)
+        tour = self.local_search.improve(tour)
+        length = float(np.sum(self.dist_matrix[tour, np.roll(tour, -1)]))
+        if length < min(incumbent, self.best) - 1e-6:
+            self.best = length
+            variables, solution = self.encode(tour)
+            model.cbSetSolution(variables, solution)
+            self.solutions += 1
 
 
 class TspGurobi:
@@ -13,34 +139,69 @@ class TspGurobi:
         self.solve_time = None
         self.obj_val = None
         self.mip_gap = None
+        self.obj_bound = None
+        self.optimal = False
+        self.build_time = None
+        self.optimize_time = None
+        self.pricing_rounds = None
+        self.heuristic_solutions = None
+        self.trace = None
+
+    def solve(self, time_limit=1800, mip_gap=0.0001, presolve=2, cuts=3, heuristics=0.1, output_flag=0,
+              formulation="mtz", initial_tour=None, trace=False, candidates=None, pricing=True,
+              tour_heuristic=False):
+        """使用Gurobi求解TSP问题
+
+        formulation可选"mtz"或"dfj"（对称边变量+惰性子回路消除）；
+        initial_tour为启发式得到的回路时作为MIP初始解载入；
+        trace为True或ProgressTrace对象时通过回调记录求解进度；
+        candidates为整数k（k近邻边）或边数组时DFJ模型只在候选边集上建模，pricing控制是否用约简费用定价保证最优性；
+        tour_heuristic为True时在回调中由节点解构造并改进回路，作为新的可行解注入（需要稠密距离矩阵）。
+        """
+        self.trace = make_trace(trace)
+        self.heuristic_solutions = 0 if tour_heuristic else None
+        if formulation == "dfj":
+            return self._solve_dfj(time_limit, mip_gap, presolve, cuts, heuristics, output_flag, initial_tour,
+                                   candidates, pricing, tour_heuristic)
+        if formulation != "mtz":
+            raise ValueError(f"未知的模型形式: {formulation}")
+        if candidates is not None:
+            raise ValueError("候选边集只适用于DFJ模型")
 
-    def solve(self, time_limit=1800, mip_gap=0.0001, presolve=2, cuts=3, heuristics=0.1, output_flag=0):
-        """使用Gurobi求解TSP问题"""
         start_time = time.time()
+        n = self.n
 
         # 创建模型
         model = gp.Model("TSP")
 
-        # 创建变量
-        x = model.addVars(self.n, self.n, vtype=GRB.BINARY, name="x")
-        u = model.addVars(self.n, vtype=GRB.CONTINUOUS, name="u")
+        # 只为i != j的弧创建变量，第k个变量对应弧(rows[k], cols[k])
+        rows, cols = np.nonzero(~np.eye(n, dtype=bool))
+        m = rows.shape[0]
+        x = model.addMVar(m, vtype=GRB.BINARY, obj=np.asarray(self.dist_matrix[rows, cols]), name="x")
+        # u[0]无界，其余u取值于[1, n-1]，直接作为变量上下界
+        u_lb = np.ones(n)
+        u_lb[0] = 0
+        u_ub = np.full(n, n - 1.0)
+        u_ub[0] = GRB.INFINITY
+        u = model.addMVar(n, lb=u_lb, ub=u_ub, vtype=GRB.CONTINUOUS, name="u")
+        model.ModelSense = GRB.MINIMIZE
 
-        # 设置目标函数
-        obj = gp.quicksum(self.dist_matrix[i, j] * x[i, j] for i in range(self.n) for j in range(self.n) if i != j)
-        model.setObjective(obj, GRB.MINIMIZE)
+        # 添加约束：每个城市出度、入度均为1
+        arc_index = np.arange(m)
+        out_matrix = sp.csr_matrix((np.ones(m), (rows, arc_index)), shape=(n, m))
+        in_matrix = sp.csr_matrix((np.ones(m), (cols, arc_index)), shape=(n, m))
+        model.addConstr(in_matrix @ x == 1)
+        model.addConstr(out_matrix @ x == 1)
 
-        # 添加约束
-        model.addConstrs(gp.quicksum(x[i, j] for i in range(self.n) if i != j) == 1 for j in range(self.n))
-        model.addConstrs(gp.quicksum(x[i, j] for j in range(self.n) if i != j) == 1 for i in range(self.n))
-
-        # 子回路消除约束
-        model.addConstrs(u[i] - u[j] + self.n * x[i, j] <= self.n - 1
-                         for i in range(1, self.n) for j in range(1, self.n) if i != j)
-
-        # 设置u变量的范围
-        for i in range(1, self.n):
-            model.addConstr(1 <= u[i])
-            model.addConstr(u[i] <= self.n - 1)
+        # 子回路消除约束 u[i] - u[j] + n * x[i, j] <= n - 1，只针对不含城市0的弧
+        mtz = np.flatnonzero((rows != 0) & (cols != 0))
+        k = mtz.shape[0]
+        mtz_index = np.arange(k)
+        u_matrix = sp.csr_matrix((np.concatenate([np.ones(k), -np.ones(k)]),
+                                  (np.concatenate([mtz_index, mtz_index]), np.concatenate([rows[mtz], cols[mtz]]))),
+                                 shape=(k, n))
+        x_matrix = sp.csr_matrix((np.full(k, float(n)), (mtz_index, mtz)), shape=(k, m))
+        model.addConstr(u_matrix @ u + x_matrix @ x <= n - 1)
 
         # 设置求解参数
         model.Params.OutputFlag = output_flag  # 控制求解过程输出
@@ -50,26 +211,40 @@ class TspGurobi:
         model.Params.Cuts = cuts
         model.Params.Heuristics = heuristics
 
-        # 求解模型
-        model.optimize()
+        # 载入初始解，u取各城市在回路中的访问次序以满足MTZ约束
+        if initial_tour is not None:
+            x.Start, u.Start = _mtz_values(initial_tour, rows, cols, n)
+
+        model._trace = self.trace
+        model._dfj = False
+        model._heuristic = None
+        if tour_heuristic:
+            x_vars, u_vars = x.tolist(), u.tolist()
+            model._heuristic = TourHeuristic(
+                self.dist_matrix, n, np.column_stack([rows, cols]), x_vars,
+                lambda tour: (x_vars + u_vars, np.concatenate(_mtz_values(tour, rows, cols, n)).tolist()))
+        model.update()
+        self.build_time = time.time() - start_time
+
+        # 求解模型，只在需要记录进度或运行回路启发式时注册回调
+        model.optimize(_callback if self.trace is not None or tour_heuristic else None)
+        self._finish_trace(model)
+        if tour_heuristic:
+            self.heuristic_solutions = model._heuristic.solutions
 
         end_time = time.time()
         self.solve_time = end_time - start_time
+        self.optimize_time = self.solve_time - self.build_time
 
         # 提取解
-        if model.status == GRB.OPTIMAL or model.status == GRB.TIME_LIMIT:
+        if model.SolCount > 0 and model.status in FEASIBLE_STATUSES:
             # 构建路径
+            selected = x.X > 0.5
+            successor = np.empty(n, dtype=int)
+            successor[rows[selected]] = cols[selected]
             tour = [0]
-            current_city = 0
-            visited = set([0])
-
-            while len(visited) < self.n:
-                for j in range(self.n):
-                    if j != current_city and x[current_city, j].X > 0.5:
-                        tour.append(j)
-                        visited.add(j)
-                        current_city = j
-                        break
+            while len(tour) < n:
+                tour.append(int(successor[tour[-1]]))
 
             # 计算总距离
             total_distance = 0
@@ -80,11 +255,131 @@ class TspGurobi:
             self.distance = total_distance
             self.obj_val = model.ObjVal
             self.mip_gap = model.MIPGap
+            self.obj_bound = model.ObjBound
+            self.optimal = model.status == GRB.OPTIMAL
+
+            return True
+        else:
+            return False
+
+    def _solve_dfj(self, time_limit, mip_gap, presolve, cuts, heuristics, output_flag, initial_tour=None,
+                   candidates=None, pricing=True, tour_heuristic=False):
+        """使用DFJ模型求解：只含度约束，子回路消除约束在回调中按需添加
+
+        candidates不为None时只在候选边集上建模。pricing为True时，每次求得稀疏模型的最优解后，
+        用子回路LP的约简费用找出可能得到更短回路的遗漏边，加入后以当前解为初始解重新求解，
+        直到不存在这样的边，此时稀疏模型的最优解即完全图上的最优解。
+        """
+        start_time = time.time()
+        pricer = None
+        if candidates is None:
+            edges = all_edges(self.n)
+        else:
+            # 候选边集总是包含初始回路的边，保证稀疏模型可行
+            if initial_tour is None:
+                initial_tour = nearest_neighbor_tour(self.dist_matrix)
+            edges = candidate_edges(self.dist_matrix, candidates, [initial_tour])
+            if pricing:
+                pricer = EdgePricer(self.dist_matrix, edges)
+                edges = pricer.edges
+        self.build_time = time.time() - start_time
+        self.pricing_rounds = 0
+
+        proven = candidates is None
+        while True:
+            build_start = time.time()
+            model, x = self._build_dfj(edges, max(time_limit - (build_start - start_time), 0), mip_gap, presolve,
+                                       cuts, heuristics, output_flag, initial_tour, tour_heuristic)
+            self.build_time += time.time() - build_start
+            model.optimize(_callback)
+            if tour_heuristic:
+                self.heuristic_solutions += model._heuristic.solutions
+            if pricer is None or model.status != GRB.OPTIMAL:
+                break
+            extra = pricer.improving_edges(edges, model.ObjVal)
+            if extra.shape[0] == 0:
+                proven = True
+                break
+            initial_tour = tour_from_edges(self.n, edges[x.X > 0.5])
+            edges = candidate_edges(self.dist_matrix, np.concatenate([edges, extra]))
+            self.pricing_rounds += 1
+        self._finish_trace(model)
+
+        end_time = time.time()
+        self.solve_time = end_time - start_time
+        self.optimize_time = self.solve_time - self.build_time
+
+        if model.SolCount > 0 and model.status in FEASIBLE_STATUSES:
+            tour = tour_from_edges(self.n, edges[x.X > 0.5])
+
+            # 计算总距离
+            total_distance = 0
+            for i in range(self.n):
+                total_distance += self.dist_matrix[tour[i], tour[(i + 1) % self.n]]
+
+            self.tour = tour
+            self.distance = total_distance
+            self.obj_val = model.ObjVal
+            # 稀疏模型的界只有在定价证明后才对完全图有效，否则取其与遗漏边下界中的较小者
+            if proven:
+                self.obj_bound = model.ObjBound
+            elif pricer is not None:
+                self.obj_bound = min(model.ObjBound, pricer.omitted_bound(edges))
+            else:
+                self.obj_bound = None
+            self.mip_gap = (model.MIPGap if candidates is None else
+                            None if self.obj_bound is None else (self.obj_val - self.obj_bound) / self.obj_val)
+            self.optimal = proven and model.status == GRB.OPTIMAL
 
             return True
         else:
             return False
 
+    def _build_dfj(self, edges, time_limit, mip_gap, presolve, cuts, heuristics, output_flag, initial_tour,
+                   tour_heuristic=False):
+        """在给定的无向边集上建立DFJ模型，第k个变量对应边edges[k]"""
+        n = self.n
+        m = edges.shape[0]
+
+        model = gp.Model("TSP_DFJ")
+        x = model.addMVar(m, vtype=GRB.BINARY, obj=np.asarray(self.dist_matrix[edges[:, 0], edges[:, 1]]),
+                          name="x")
+        model.ModelSense = GRB.MINIMIZE
+
+        # 每个城市的度为2
+        model.addConstr(incidence_matrix(edges, n) @ x == 2)
+
+        # 设置求解参数
+        model.Params.OutputFlag = output_flag
+        model.Params.TimeLimit = time_limit
+        model.Params.MIPGap = mip_gap
+        model.Params.Presolve = presolve
+        model.Params.Cuts = cuts
+        model.Params.Heuristics = heuristics
+        model.Params.LazyConstraints = 1
+        model.Params.PreCrush = 1
+
+        # 载入初始解
+        if initial_tour is not None:
+            x.Start = _tour_indicator(edges, initial_tour, n)
+
+        model._vars = x.tolist()
+        model._edges = edges
+        model._n = n
+        model._trace = self.trace
+        model._dfj = True
+        model._heuristic = None
+        if tour_heuristic:
+            model._heuristic = TourHeuristic(self.dist_matrix, n, edges, model._vars,
+                                             lambda tour: (model._vars, _tour_indicator(edges, tour, n).tolist()))
+        model.update()
+        return model, x
+
+    def _finish_trace(self, model):
+        """求解结束后补充最终的最好解和界"""
+        if self.trace is not None and model.SolCount > 0:
+            self.trace.record(incumbent=model.ObjVal, bound=model.ObjBound, nodes=model.NodeCount, force=True)
+
     def get_results(self):
         """获取求解结果"""
         return {
@@ -92,7 +387,14 @@ class TspGurobi:
             'distance': self.distance,
             'solve_time': self.solve_time,
             'obj_val': self.obj_val,
-            'mip_gap': self.mip_gap
+            'mip_gap': self.mip_gap,
+            'obj_bound': self.obj_bound,
+            'optimal': self.optimal,
+            'build_time': self.build_time,
+            'optimize_time': self.optimize_time,
+            'pricing_rounds': self.pricing_rounds,
+            'heuristic_solutions': self.heuristic_solutions,
+            'trace': self.trace
         }
 
     def print_results(self):
@@ -101,7 +403,7 @@ class TspGurobi:
             print("Gurobi求解结果:")
             print(f"最优路径: {[city + 1 for city in self.tour]}")
             print(f"路径长度: {self.distance}")
-            print(f"求解时间: {self.solve_time:.2f}秒")
+            print(f"求解时间: {self.solve_time:.2f}秒（建模{self.build_time:.2f}秒）")
             print(f"目标函数值: {self.obj_val}")
             print(f"MIP间隙: {self.mip_gap}")
         else:
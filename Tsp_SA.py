@@ -1,5 +1,206 @@
 import numpy as np
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from progress import make_trace
+from sa_kernel import markov_chain
+from tour import build_positions, swap, exchange_segments
+
+
+def tour_length(dist_matrix, tour):
+    """计算完整回路的长度"""
+    n = len(tour)
+    total_dist = 0
+    for i in range(n - 1):
+        total_dist += dist_matrix[tour[i], tour[i + 1]]
+    total_dist += dist_matrix[tour[-1], tour[0]]
+    return total_dist
+
+
+def swap_delta(dist_matrix, tour, i, j):
+    """计算交换位置i和j上的城市后路径长度的变化量（只涉及最多4条边）"""
+    n = len(tour)
+
+    def city(k):
+        if k == i:
+            return tour[j]
+        if k == j:
+            return tour[i]
+        return tour[k]
+
+    delta = 0
+    # 以边的起点位置标识边，相邻或首尾相接时自动去重
+    for k in {(i - 1) % n, i, (j - 1) % n, j}:
+        k_next = (k + 1) % n
+        delta += dist_matrix[city(k), city(k_next)] - dist_matrix[tour[k], tour[k_next]]
+    return delta
+
+
+def segment_delta(dist_matrix, tour, i, j, k):
+    """计算交换相邻片段tour[i+1:j]与tour[j:k+1]后路径长度的变化量（只涉及3条边），要求i < j < k"""
+    if j == i + 1:
+        # 前一片段为空，路径不变
+        return 0
+    n = len(tour)
+    a, a_next = tour[i], tour[i + 1]
+    b_prev, b = tour[j - 1], tour[j]
+    c, c_next = tour[k], tour[(k + 1) % n]
+    return (dist_matrix[a, b] + dist_matrix[c, a_next] + dist_matrix[b_prev, c_next]
+            - dist_matrix[a, a_next] - dist_matrix[b_prev, b] - dist_matrix[c, c_next])
+
+
+def generate_move_block(rng, n, markov_length):
+    """为一条Markov链预先生成全部随机数：移动类型、下标和接受判据用的均匀随机数
+
+    返回的indices为(markov_length, 3)数组：两交换行的前两列为升序的两个不同位置，
+    三交换行为升序的三个不同位置。
+    """
+    is_swap = rng.random(markov_length) < 0.5
+    # 不放回抽样：依次在剩余位置中抽取并映射回原下标
+    ind1 = rng.integers(0, n, markov_length)
+    ind2 = rng.integers(0, n - 1, markov_length)
+    ind2 += ind2 >= ind1
+    lo = np.minimum(ind1, ind2)
+    hi = np.maximum(ind1, ind2)
+    ind3 = rng.integers(0, n - 2, markov_length)
+    ind3 += ind3 >= lo
+    ind3 += ind3 >= hi
+
+    indices = np.sort(np.stack([lo, hi, ind3], axis=1), axis=1)
+    indices[is_swap, 0] = lo[is_swap]
+    indices[is_swap, 1] = hi[is_swap]
+    accept_draws = rng.random(markov_length)
+    return is_swap, indices, accept_draws
+
+
+def _markov_chain_python(dist_matrix, tour, pos, E_current, best_tour, E_best, t, is_swap, indices, accept_draws):
+    """sa_kernel.markov_chain的纯Python实现，接口与返回值相同"""
+    n_accepted = 0
+    for swap_move, (ind1, ind2, ind3), r in zip(is_swap.tolist(), indices.tolist(), accept_draws.tolist()):
+        # 产生新解：只计算受影响边的增量，接受后才原地修改当前解
+        if swap_move:
+            # 两交换
+            delta = swap_delta(dist_matrix, tour, ind1, ind2)
+            move, args = swap, (ind1, ind2)
+        else:
+            # 三交换
+            delta = segment_delta(dist_matrix, tour, ind1, ind2, ind3)
+            move, args = exchange_segments, (ind1, ind2, ind3)
+
+        # 接受准则
+        if delta < 0 or r < np.exp(-delta / t):
+            move(tour, pos, *args)
+            E_current += delta
+            n_accepted += 1
+            if E_current < E_best:
+                E_best = E_current
+                best_tour = tour.copy()
+    return tour, E_current, best_tour, E_best, n_accepted
+
+
+def estimate_initial_temperature(dist_matrix, tour, rng, acceptance=0.8, samples=1000):
+    """根据随机移动的能量增量估计初始温度，使平均劣化移动的接受概率约为acceptance"""
+    is_swap, indices, _ = generate_move_block(rng, len(tour), samples)
+    deltas = []
+    for swap_move, (ind1, ind2, ind3) in zip(is_swap.tolist(), indices.tolist()):
+        if swap_move:
+            deltas.append(swap_delta(dist_matrix, tour, ind1, ind2))
+        else:
+            deltas.append(segment_delta(dist_matrix, tour, ind1, ind2, ind3))
+    deltas = np.array(deltas, dtype=np.float64)
+    uphill = deltas[deltas > 0]
+    if uphill.shape[0] == 0:
+        return 1.0
+    return float(-uphill.mean() / np.log(acceptance))
+
+
+def anneal(dist_matrix, sol_current, sol_best, E_current, E_best, rng, t, a, tf, markov_length,
+           use_jit=False, max_steps=None, deadline=None, min_acceptance=0.0, stagnation_steps=None, trace=None):
+    """从温度t开始按几何降温运行到tf以下（或运行max_steps个温度步）
+
+    deadline为截止时刻（time.time()）时，每个温度步后按实测的每次移动耗时和当前链长重新设定降温系数，
+    使温度恰好在截止时刻降到tf；接受率低于min_acceptance的Markov链在下一温度步减半长度；
+    温度降到t与tf的几何中点以下后，最优解连续stagnation_steps个温度步没有改进时提前结束；
+    trace不为None时每个温度步记录一个检查点，
+    trace收到停止请求时立即结束。
+    返回(sol_current, E_current, sol_best, E_best, t, 温度步数, 接受次数)，便于分段继续退火。
+    """
+    chain = markov_chain if use_jit else _markov_chain_python
+    n = len(sol_current)
+    pos = build_positions(sol_current)
+    length = markov_length
+    min_length = max(1, markov_length // 16)
+    steps = 0
+    accepted = 0
+    iterations = 0
+    since_improvement = 0
+    # 高温阶段最优解本来就很少改进，停滞只在温度降到几何中点以下后计数
+    stagnation_t = np.sqrt(t * tf)
+    while t >= tf and (max_steps is None or steps < max_steps):
+        step_start = time.time()
+        E_previous_best = E_best
+        # 每个温度步一次性生成整条Markov链所需的随机数
+        is_swap, indices, accept_draws = generate_move_block(rng, n, length)
+        sol_current, E_current, sol_best, E_best, n_accepted = chain(
+            dist_matrix, sol_current, pos, E_current, sol_best, E_best,
+            t, is_swap, indices, accept_draws)
+        accepted += n_accepted
+        iterations += length
+        steps += 1
+        if trace is not None:
+            trace.record(incumbent=E_best, nodes=iterations, temperature=t, acceptance_rate=n_accepted / length)
+            if trace.stopped():
+                break
+
+        # 停滞判断
+        if E_best < E_previous_best or t > stagnation_t:
+            since_improvement = 0
+        else:
+            since_improvement += 1
+        if stagnation_steps is not None and since_improvement >= stagnation_steps:
+            break
+        # 按剩余时间重新设定降温系数时需要本步的链长
+        move_time = (time.time() - step_start) / length
+        # 接受率崩溃时缩短Markov链
+        if n_accepted < min_acceptance * length:
+            length = max(min_length, length // 2)
+        if deadline is not None:
+            now = time.time()
+            if now >= deadline:
+                break
+            steps_left = max(1.0, (deadline - now) / max(move_time * length, 1e-9))
+            if t > tf:
+                a = (tf / t) ** (1.0 / steps_left)
+        t *= a
+    return sol_current, E_current, sol_best, E_best, t, steps, accepted
+
+
+# 并行模式下每个工作进程通过共享内存访问的距离矩阵
+_shared_dist = None
+
+
+def _attach_shared_dist(shm_name, shape, dtype, dist_matrix):
+    """工作进程初始化：挂载共享内存中的距离矩阵，非ndarray距离对象直接使用传入的副本"""
+    global _shared_dist
+    if shm_name is None:
+        _shared_dist = (None, dist_matrix)
+        return
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # 同时保存shm对象，避免其被回收后缓冲区失效
+    _shared_dist = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+
+def _run_chain(state, a, tf, markov_length, use_jit, max_steps):
+    """在工作进程中继续运行一条退火链，state为(当前解, 当前能量, 最优解, 最优能量, 温度, rng)"""
+    dist_matrix = _shared_dist[1]
+    sol_current, E_current, sol_best, E_best, t, rng = state
+    start_time = time.time()
+    sol_current, E_current, sol_best, E_best, t, steps, accepted = anneal(
+        dist_matrix, sol_current, sol_best, E_current, E_best, rng, t, a, tf, markov_length,
+        use_jit, max_steps)
+    return (sol_current, E_current, sol_best, E_best, t, rng), steps, accepted, time.time() - start_time
 
 
 class TspSA:
@@ -10,73 +211,138 @@ class TspSA:
         self.tour = None
         self.distance = None
         self.solve_time = None
+        self.chain_stats = None
+        self.trace = None
+
+    def _resolve_jit(self, use_jit):
+        """确定是否使用编译内核"""
+        if use_jit is None:
+            return markov_chain is not None and isinstance(self.dist_matrix, np.ndarray)
+        if use_jit and markov_chain is None:
+            raise RuntimeError("编译内核不可用，请安装numba")
+        return use_jit
+
+    def solve(self, a=0.99, t0=97, tf=3, markov_length=10000, use_jit=None, seed=None,
+              time_limit=None, min_acceptance=0.0, stagnation_steps=None, trace=False, initial_tour=None):
+        """使用模拟退火算法求解TSP问题
 
-    def solve(self, a=0.99, t0=97, tf=3, markov_length=10000):
-        """使用模拟退火算法求解TSP问题"""
+        use_jit为None时在可用时自动使用编译内核，seed用于复现结果。
+        t0="auto"时根据采样的移动增量估计初始温度，tf="auto"时取t0的千分之一。
+        指定time_limit（秒）时降温系数a按实测速度自动调整，使退火在时限内完成；
+        min_acceptance和stagnation_steps分别控制低接受率时缩短Markov链以及停滞时提前结束。
+        trace为True或ProgressTrace对象时按温度步记录最好解、温度和接受率。
+        initial_tour为初始回路（如construction模块的构造结果），默认为随机回路；
+        从较好的初始回路出发时应配合较低的t0（或t0="auto"），否则高温阶段会先把它打乱。
+        """
         start_time = time.time()
+        self.trace = make_trace(trace)
 
-        n = self.n
-        sol_new = np.arange(n)
-        np.random.shuffle(sol_new)
-
-        sol_current = sol_new.copy()
-        sol_best = sol_new.copy()
-
-        def calculate_distance(solution):
-            total_dist = 0
-            for i in range(n - 1):
-                total_dist += self.dist_matrix[solution[i], solution[i + 1]]
-            total_dist += self.dist_matrix[solution[-1], solution[0]]
-            return total_dist
-
-        E_current = calculate_distance(sol_current)
-        E_best = E_current
-        E_new = E_current
-
-        t = t0
-        while t >= tf:
-            for _ in range(markov_length):
-                # 产生新解
-                if np.random.rand() < 0.5:
-                    # 两交换
-                    ind1, ind2 = np.random.choice(n, 2, replace=False)
-                    sol_new[ind1], sol_new[ind2] = sol_new[ind2], sol_new[ind1]
-                else:
-                    # 三交换
-                    ind1, ind2, ind3 = np.random.choice(n, 3, replace=False)
-                    indices = sorted([ind1, ind2, ind3])
-                    ind1, ind2, ind3 = indices
-
-                    # 执行三交换操作
-                    sol_new = np.concatenate([
-                        sol_new[:ind1 + 1],
-                        sol_new[ind2:ind3 + 1],
-                        sol_new[ind1 + 1:ind2],
-                        sol_new[ind3 + 1:]
-                    ])
-
-                E_new = calculate_distance(sol_new)
-
-                # 接受准则
-                if E_new < E_current:
-                    E_current = E_new
-                    sol_current = sol_new.copy()
-                    if E_new < E_best:
-                        E_best = E_new
-                        sol_best = sol_new.copy()
-                else:
-                    if np.random.rand() < np.exp(-(E_new - E_current) / t):
-                        E_current = E_new
-                        sol_current = sol_new.copy()
-                    else:
-                        sol_new = sol_current.copy()
-
-            t *= a
+        use_jit = self._resolve_jit(use_jit)
+        dist_matrix = self.dist_matrix
+        rng = np.random.default_rng(seed)
+        if initial_tour is None:
+            sol_current = rng.permutation(self.n).astype(np.int64)
+        else:
+            sol_current = np.array(initial_tour, dtype=np.int64)
+        E_current = tour_length(dist_matrix, sol_current)
+
+        if t0 == "auto":
+            t0 = estimate_initial_temperature(dist_matrix, sol_current, rng)
+        if tf == "auto":
+            tf = t0 * 1e-3
+        deadline = start_time + time_limit if time_limit is not None else None
+
+        _, _, sol_best, _, _, _, _ = anneal(
+            dist_matrix, sol_current, sol_current.copy(), E_current, E_current,
+            rng, t0, a, tf, markov_length, use_jit,
+            deadline=deadline, min_acceptance=min_acceptance, stagnation_steps=stagnation_steps,
+            trace=self.trace)
 
         end_time = time.time()
         self.solve_time = end_time - start_time
         self.tour = sol_best
-        self.distance = E_best
+        # 增量累加存在浮点误差，最终长度按完整回路重新计算
+        self.distance = tour_length(dist_matrix, sol_best)
+
+        return True
+
+    def solve_parallel(self, n_chains=None, a=0.99, t0=97, tf=3, markov_length=10000, use_jit=None, seed=None,
+                       migration_interval=None, initial_tour=None):
+        """在多个进程中并行运行多条独立种子的退火链，返回其中的最优解
+
+        距离矩阵通过共享内存传给工作进程。migration_interval为None时各链独立运行；
+        否则每经过migration_interval个温度步进行一次迁移（岛屿模型），
+        当前解劣于中位数的链改从全局最优解继续退火。各链统计信息保存在chain_stats中。
+        initial_tour不为None时所有链都从该回路出发。
+        t0="auto"时对各链的初始回路分别估计初始温度并取平均作为共同的t0，tf="auto"时取t0的千分之一。
+        """
+        start_time = time.time()
+        self.trace = None
+
+        n_chains = n_chains or os.cpu_count()
+        use_jit = self._resolve_jit(use_jit)
+        dist_matrix = self.dist_matrix
+
+        # 为每条链派生独立的随机数发生器
+        states = []
+        for child in np.random.SeedSequence(seed).spawn(n_chains):
+            rng = np.random.default_rng(child)
+            if initial_tour is None:
+                sol = rng.permutation(self.n).astype(np.int64)
+            else:
+                sol = np.array(initial_tour, dtype=np.int64)
+            energy = tour_length(dist_matrix, sol)
+            states.append((sol, energy, sol.copy(), energy, t0, rng))
+        if t0 == "auto":
+            t0 = float(np.mean([estimate_initial_temperature(dist_matrix, s[0], s[5]) for s in states]))
+            states = [s[:4] + (t0, s[5]) for s in states]
+        if tf == "auto":
+            tf = t0 * 1e-3
+        stats = [{'chain': k, 'temperature_steps': 0, 'accepted': 0, 'time': 0.0} for k in range(n_chains)]
+
+        shm = None
+        if isinstance(dist_matrix, np.ndarray):
+            shm = shared_memory.SharedMemory(create=True, size=max(dist_matrix.nbytes, 1))
+            np.ndarray(dist_matrix.shape, dtype=dist_matrix.dtype, buffer=shm.buf)[:] = dist_matrix
+            initargs = (shm.name, dist_matrix.shape, dist_matrix.dtype, None)
+        else:
+            initargs = (None, None, None, dist_matrix)
+
+        try:
+            with ProcessPoolExecutor(max_workers=n_chains, initializer=_attach_shared_dist,
+                                     initargs=initargs) as executor:
+                while any(state[4] >= tf for state in states):
+                    futures = [executor.submit(_run_chain, state, a, tf, markov_length, use_jit,
+                                               migration_interval)
+                               for state in states]
+                    states = []
+                    for k, future in enumerate(futures):
+                        state, steps, accepted, elapsed = future.result()
+                        states.append(state)
+                        stats[k]['temperature_steps'] += steps
+                        stats[k]['accepted'] += accepted
+                        stats[k]['time'] += elapsed
+
+                    if migration_interval is not None:
+                        # 迁移：劣于中位数的链从全局最优解继续
+                        best = min(states, key=lambda s: s[3])
+                        median = np.median([s[1] for s in states])
+                        states = [(best[2].copy(), best[3], s[2], s[3], s[4], s[5]) if s[1] > median else s
+                                  for s in states]
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+        for k, state in enumerate(states):
+            stats[k]['distance'] = float(tour_length(dist_matrix, state[2]))
+        best_chain = min(range(n_chains), key=lambda k: stats[k]['distance'])
+
+        end_time = time.time()
+        self.solve_time = end_time - start_time
+        self.tour = states[best_chain][2]
+        self.distance = stats[best_chain]['distance']
+        self.chain_stats = stats
 
         return True
 
@@ -85,7 +351,9 @@ class TspSA:
         return {
             'tour': self.tour,
             'distance': self.distance,
-            'solve_time': self.solve_time
+            'solve_time': self.solve_time,
+            'chain_stats': self.chain_stats,
+            'trace': self.trace
         }
 
     def print_results(self):
@@ -96,4 +364,4 @@ class TspSA:
             print(f"路径长度: {self.distance}")
             print(f"求解时间: {self.solve_time:.2f}秒")
         else:
-            print("模拟退火未能找到可行解")
\ No newline at end of file
+            print("模拟退火未能找到可行解")
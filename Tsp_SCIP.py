@@ -1,7 +1,90 @@
-from pyscipopt import Model, quicksum, multidict
+from pyscipopt import Model, quicksum, multidict, Conshdlr, Eventhdlr, SCIP_RESULT, SCIP_EVENTTYPE
 import time
 import numpy as np
 
+from candidates import (EdgePricer, all_edges, candidate_edges, edge_keys, incidence_matrix, nearest_neighbor_tour,
+                        tour_edges)
+from progress import make_trace
+from subtour import connected_components, tour_from_edges, tour_arcs
+
+# 在MIP间隙内求得最优解时SCIP返回"gaplimit"，与Gurobi的OPTIMAL含义相同
+SOLVED_STATUSES = ("optimal", "gaplimit")
+# 提前结束但可能已有可行解的状态（userinterrupt为收到停止请求后调用interruptSolve()）
+STOPPED_STATUSES = ("timelimit", "userinterrupt")
+
+
+class ProgressEventhdlr(Eventhdlr):
+    """进度记录事件处理器：在找到更好解和节点求解完成时记录最好解、对偶界和节点数，收到停止请求时中断求解"""
+
+    EVENTS = SCIP_EVENTTYPE.BESTSOLFOUND | SCIP_EVENTTYPE.NODESOLVED
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def eventinit(self):
+        self.model.catchEvent(self.EVENTS, self)
+
+    def eventexit(self):
+        self.model.dropEvent(self.EVENTS, self)
+
+    def eventexec(self, event):
+        incumbent = self.model.getPrimalbound()
+        self.trace.record(incumbent=incumbent if not self.model.isInfinity(incumbent) else None,
+                          bound=self.model.getDualbound(), nodes=self.model.getNNodes())
+        if self.trace.stopped():
+            self.model.interruptSolve()
+
+
+class SubtourElimination(Conshdlr):
+    """DFJ子回路消除约束处理器：检查整数解与分数解的连通性并按需添加子回路割"""
+
+    def __init__(self, edges, variables, n):
+        self.edges = edges
+        self.variables = variables
+        self.n = n
+
+    def _components(self, solution, threshold):
+        """返回解中取值大于阈值的边构成的连通分量"""
+        values = np.array([self.model.getSolVal(solution, var) for var in self.variables])
+        return connected_components(self.n, self.edges[values > threshold])
+
+    def _add_cuts(self, components):
+        """为每个连通分量添加子回路消除约束"""
+        for component in components:
+            inside = np.zeros(self.n, dtype=bool)
+            inside[component] = True
+            index = np.flatnonzero(inside[self.edges[:, 0]] & inside[self.edges[:, 1]])
+            self.model.addCons(quicksum(self.variables[k] for k in index) <= len(component) - 1, removable=True)
+
+    def conscheck(self, constraints, solution, checkintegrality, checklprows, printreason, completely):
+        if len(self._components(solution, 0.5)) > 1:
+            return {"result": SCIP_RESULT.INFEASIBLE}
+        return {"result": SCIP_RESULT.FEASIBLE}
+
+    def consenfolp(self, constraints, nusefulconss, solinfeasible):
+        components = self._components(None, 0.5)
+        if len(components) > 1:
+            self._add_cuts(components)
+            return {"result": SCIP_RESULT.CONSADDED}
+        return {"result": SCIP_RESULT.FEASIBLE}
+
+    def consenfops(self, constraints, nusefulconss, solinfeasible, objinfeasible):
+        components = self._components(None, 0.5)
+        if len(components) > 1:
+            self._add_cuts(components)
+            return {"result": SCIP_RESULT.CONSADDED}
+        return {"result": SCIP_RESULT.FEASIBLE}
+
+    def conssepalp(self, constraints, nusefulconss):
+        components = self._components(None, 1e-6)
+        if len(components) > 1:
+            self._add_cuts(components)
+            return {"result": SCIP_RESULT.CONSADDED}
+        return {"result": SCIP_RESULT.DIDNOTFIND}
+
+    def conslock(self, constraint, locktype, nlockspos, nlocksneg):
+        pass
+
 
 class TspScip:
     def __init__(self, dist_matrix, n_cities):
@@ -12,9 +95,29 @@ class TspScip:
         self.solve_time = None
         self.obj_val = None
         self.mip_gap = None
+        self.obj_bound = None
+        self.optimal = False
+        self.pricing_rounds = None
+        self.trace = None
+
+    def solve(self, time_limit=1800, mip_gap=0.0001, presolve=True, cuts=True, heuristics=True, output_flag=False,
+              formulation="mtz", initial_tour=None, trace=False, candidates=None, pricing=True):
+        """使用SCIP求解TSP问题
+
+        formulation可选"mtz"或"dfj"（对称边变量+约束处理器按需消除子回路）；
+        initial_tour为启发式得到的回路时作为MIP初始解载入；
+        trace为True或ProgressTrace对象时通过事件处理器记录求解进度；
+        candidates为整数k（k近邻边）或边数组时DFJ模型只在候选边集上建模，pricing控制是否用约简费用定价保证最优性。
+        """
+        self.trace = make_trace(trace)
+        if formulation == "dfj":
+            return self._solve_dfj(time_limit, mip_gap, presolve, cuts, heuristics, output_flag, initial_tour,
+                                   candidates, pricing)
+        if formulation != "mtz":
+            raise ValueError(f"未知的模型形式: {formulation}")
+        if candidates is not None:
+            raise ValueError("候选边集只适用于DFJ模型")
 
-    def solve(self, time_limit=1800, mip_gap=0.0001, presolve=True, cuts=True, heuristics=True, output_flag=False):
-        """使用SCIP求解TSP问题"""
         start_time = time.time()
 
         # 创建模型
@@ -64,14 +167,26 @@ class TspScip:
         # 设置u[0] = 0
         model.addCons(u[0] == 0, "u0_fix")
 
+        # 载入初始解，u取各城市在回路中的访问次序以满足MTZ约束
+        if initial_tour is not None:
+            arcs, order = tour_arcs(initial_tour)
+            sol = model.createPartialSol()
+            for var in x.values():
+                model.setSolVal(sol, var, 0)
+            for i, j in arcs:
+                model.setSolVal(sol, x[i, j], 1)
+            for i in range(self.n):
+                model.setSolVal(sol, u[i], order[i])
+            model.addSol(sol)
+
         # 求解模型
-        model.optimize()
+        self._optimize(model)
 
         end_time = time.time()
         self.solve_time = end_time - start_time
 
-        # 提取解
-        if model.getStatus() == "optimal" or model.getStatus() == "timelimit":
+        # 提取解（中断或超时时可能还没有可行解）
+        if model.getNSols() > 0 and (model.getStatus() in SOLVED_STATUSES or model.getStatus() in STOPPED_STATUSES):
             # 构建路径
             tour = [0]
             current_city = 0
@@ -104,11 +219,127 @@ class TspScip:
                     self.mip_gap = 0.0
             except:
                 self.mip_gap = None
+            self.obj_bound = model.getDualbound()
+            self.optimal = model.getStatus() in SOLVED_STATUSES
 
             return True
         else:
             return False
 
+    def _solve_dfj(self, time_limit, mip_gap, presolve, cuts, heuristics, output_flag, initial_tour=None,
+                   candidates=None, pricing=True):
+        """使用DFJ模型求解：只含度约束，子回路消除由约束处理器在求解过程中添加
+
+        candidates不为None时只在候选边集上建模，pricing为True时按约简费用加回可能改进当前解的遗漏边并重新求解，
+        直到不存在这样的边（与TspGurobi相同）。
+        """
+        start_time = time.time()
+        pricer = None
+        if candidates is None:
+            edges = all_edges(self.n)
+        else:
+            # 候选边集总是包含初始回路的边，保证稀疏模型可行
+            if initial_tour is None:
+                initial_tour = nearest_neighbor_tour(self.dist_matrix)
+            edges = candidate_edges(self.dist_matrix, candidates, [initial_tour])
+            if pricing:
+                pricer = EdgePricer(self.dist_matrix, edges)
+                edges = pricer.edges
+        self.pricing_rounds = 0
+
+        proven = candidates is None
+        while True:
+            model, x = self._build_dfj(edges, max(time_limit - (time.time() - start_time), 0), mip_gap, presolve,
+                                       cuts, heuristics, output_flag, initial_tour)
+            self._optimize(model)
+            if pricer is None or model.getStatus() not in SOLVED_STATUSES:
+                break
+            extra = pricer.improving_edges(edges, model.getObjVal())
+            if extra.shape[0] == 0:
+                proven = True
+                break
+            initial_tour = tour_from_edges(self.n, edges[[model.getVal(var) > 0.5 for var in x]])
+            edges = candidate_edges(self.dist_matrix, np.concatenate([edges, extra]))
+            self.pricing_rounds += 1
+
+        end_time = time.time()
+        self.solve_time = end_time - start_time
+
+        if model.getNSols() > 0 and (model.getStatus() in SOLVED_STATUSES or model.getStatus() in STOPPED_STATUSES):
+            tour = tour_from_edges(self.n, edges[[model.getVal(var) > 0.5 for var in x]])
+
+            # 计算总距离
+            total_distance = 0
+            for i in range(self.n):
+                total_distance += self.dist_matrix[tour[i], tour[(i + 1) % self.n]]
+
+            self.tour = tour
+            self.distance = total_distance
+            self.obj_val = model.getObjVal()
+            # 稀疏模型的界只有在定价证明后才对完全图有效，否则取其与遗漏边下界中的较小者
+            if proven:
+                self.obj_bound = model.getDualbound()
+            elif pricer is not None:
+                self.obj_bound = min(model.getDualbound(), pricer.omitted_bound(edges))
+            else:
+                self.obj_bound = None
+            self.mip_gap = (model.getGap() if candidates is None else
+                            None if self.obj_bound is None else (self.obj_val - self.obj_bound) / self.obj_val)
+            self.optimal = proven and model.getStatus() in SOLVED_STATUSES
+
+            return True
+        else:
+            return False
+
+    def _build_dfj(self, edges, time_limit, mip_gap, presolve, cuts, heuristics, output_flag, initial_tour):
+        """在给定的无向边集上建立DFJ模型，第k个变量对应边edges[k]"""
+        model = Model("TSP_DFJ")
+
+        # 设置参数
+        model.setParam("limits/time", time_limit)
+        model.setParam("limits/gap", mip_gap)
+        model.setParam("presolving/maxrounds", 2 if presolve else 0)
+        model.setParam("separating/maxrounds", 3 if cuts else 0)
+        model.setParam("heuristics/rounding/freq", 10 if heuristics else -1)
+        # 子回路约束不在初始模型中，禁止依赖完整约束信息的对偶约简
+        model.setParam("misc/allowstrongdualreds", False)
+        model.setParam("misc/allowweakdualreds", False)
+        model.hideOutput(not output_flag)
+
+        x = [model.addVar(f"x_{i}_{j}", vtype="B", obj=self.dist_matrix[i, j]) for i, j in edges]
+        model.setMinimize()
+
+        # 每个城市的度为2
+        incidence = incidence_matrix(edges, self.n).tocsr()
+        for i in range(self.n):
+            incident = incidence.indices[incidence.indptr[i]:incidence.indptr[i + 1]]
+            model.addCons(quicksum(x[k] for k in incident) == 2, f"degree_{i}")
+
+        conshdlr = SubtourElimination(edges, x, self.n)
+        model.includeConshdlr(conshdlr, "subtour", "DFJ subtour elimination",
+                              sepapriority=1000, enfopriority=-1, chckpriority=-1,
+                              sepafreq=1, propfreq=-1, eagerfreq=-1, maxprerounds=0,
+                              delaysepa=False, delayprop=False, needscons=False)
+
+        # 载入初始解
+        if initial_tour is not None:
+            start = np.isin(edge_keys(edges, self.n), edge_keys(tour_edges([initial_tour]), self.n))
+            sol = model.createPartialSol()
+            for var, value in zip(x, start):
+                model.setSolVal(sol, var, float(value))
+            model.addSol(sol)
+
+        return model, x
+
+    def _optimize(self, model):
+        """求解模型，需要记录进度时先注册事件处理器，结束后补充最终的最好解和界"""
+        if self.trace is not None:
+            model.includeEventhdlr(ProgressEventhdlr(self.trace), "progress", "records solve progress")
+        model.optimize()
+        if self.trace is not None and model.getNSols() > 0:
+            self.trace.record(incumbent=model.getPrimalbound(), bound=model.getDualbound(),
+                              nodes=model.getNNodes(), force=True)
+
     def get_results(self):
         """获取求解结果"""
         return {
@@ -116,7 +347,11 @@ class TspScip:
             'distance': self.distance,
             'solve_time': self.solve_time,
             'obj_val': self.obj_val,
-            'mip_gap': self.mip_gap
+            'mip_gap': self.mip_gap,
+            'obj_bound': self.obj_bound,
+            'optimal': self.optimal,
+            'pricing_rounds': self.pricing_rounds,
+            'trace': self.trace
         }
 
     def print_results(self):
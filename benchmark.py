@@ -0,0 +1,160 @@
+import argparse
+import csv
+import json
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from data import TSPData
+from solvers import available_solvers, get_solver, run_solver
+
+# 记录中参与基准对比的指标及其方向（越小越好）
+COMPARED_METRICS = ('solve_time', 'distance')
+
+
+def make_instance(spec):
+    """根据实例描述加载数据：“random:<n>:<seed>”为随机均匀实例，其余视为文件路径"""
+    data = TSPData()
+    if spec.startswith('random:'):
+        _, n, instance_seed = spec.split(':')
+        rng = np.random.default_rng(int(instance_seed))
+        data.load_custom_data(rng.random((int(n), 2)) * 1000)
+        data.name = spec
+    else:
+        data.load_file(spec)
+    return data
+
+
+def _run_case(solver_name, spec, seed, time_limit, formulation, candidates=None):
+    """在独立进程中运行一次求解并返回一条记录，内存峰值取该进程的最大常驻内存"""
+    start_time = time.time()
+    data = make_instance(spec)
+    load_time = time.time() - start_time
+    params = {}
+    if get_solver(solver_name).exact:
+        params['formulation'] = formulation
+        if candidates is not None:
+            params['candidates'] = candidates
+    results = run_solver(solver_name, data.dist_matrix, data.coordinates, time_limit=time_limit, seed=seed,
+                         **params)
+    return {
+        'instance': spec,
+        'n': data.n,
+        'solver': solver_name,
+        'seed': seed,
+        'success': results['success'],
+        'load_time': load_time,
+        'build_time': results.get('build_time'),
+        'solve_time': results.get('solve_time'),
+        'distance': None if results.get('distance') is None else float(results['distance']),
+        'mip_gap': results.get('mip_gap'),
+        'memory_peak_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_benchmark(instances, solvers, seeds, time_limit=60, formulation="dfj", candidates=None):
+    """对每个实例、求解器和随机种子的组合运行一次求解，每次求解使用全新进程以隔离内存统计"""
+    records = []
+    for spec in instances:
+        for solver_name in solvers:
+            # 精确求解器与随机种子无关，只运行一次
+            case_seeds = seeds[:1] if get_solver(solver_name).exact else seeds
+            for seed in case_seeds:
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    future = executor.submit(_run_case, solver_name, spec, seed, time_limit, formulation,
+                                             candidates)
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        record = {'instance': spec, 'solver': solver_name, 'seed': seed,
+                                  'success': False, 'error': repr(e)}
+                records.append(record)
+                print(f"{spec:<24} {solver_name:<8} seed={seed:<4} "
+                      f"距离={record.get('distance')} 时间={record.get('solve_time')}")
+
+    # 相对于同一实例上所有求解器找到的最好解的差距
+    best = {}
+    for record in records:
+        if record.get('distance') is not None:
+            best[record['instance']] = min(best.get(record['instance'], np.inf), record['distance'])
+    for record in records:
+        if record.get('distance') is not None:
+            record['gap'] = (record['distance'] - best[record['instance']]) / best[record['instance']]
+    return records
+
+
+def save_results(records, path):
+    """按扩展名保存为JSON或CSV"""
+    if path.endswith('.csv'):
+        fields = sorted({key for record in records for key in record})
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(path, 'w') as f:
+            json.dump(records, f, indent=2)
+
+
+def compare_with_baseline(records, baseline_path, tolerance=0.1):
+    """与基准结果比较，返回退化项列表：同一(实例, 求解器, 种子)的指标比基准差超过tolerance"""
+    with open(baseline_path) as f:
+        baseline = {(r['instance'], r['solver'], r['seed']): r for r in json.load(f)}
+
+    regressions = []
+    for record in records:
+        reference = baseline.get((record['instance'], record['solver'], record['seed']))
+        if reference is None:
+            continue
+        if reference.get('success') and not record.get('success'):
+            regressions.append({'instance': record['instance'], 'solver': record['solver'],
+                                'seed': record['seed'], 'metric': 'success',
+                                'baseline': True, 'current': False})
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = reference.get(metric), record.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append({'instance': record['instance'], 'solver': record['solver'],
+                                    'seed': record['seed'], 'metric': metric,
+                                    'baseline': old, 'current': new})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TSP求解器基准测试")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[52, 100, 200],
+                        help="随机实例的城市数")
+    parser.add_argument('--tsplib', nargs='*', default=[], help="TSPLIB或坐标文件路径")
+    parser.add_argument('--solvers', nargs='*', default=['sa', 'gurobi', 'scip'], choices=available_solvers())
+    parser.add_argument('--seeds', type=int, nargs='*', default=[0, 1, 2])
+    parser.add_argument('--time-limit', type=float, default=60, help="每次求解的时间限制（秒）")
+    parser.add_argument('--formulation', default='dfj', choices=['mtz', 'dfj'], help="精确求解器的模型形式")
+    parser.add_argument('--candidates', type=int, help="DFJ模型只使用k近邻候选边（带定价）")
+    parser.add_argument('--output', default='benchmark_results.json', help="结果文件（.json或.csv）")
+    parser.add_argument('--baseline', help="用于比较的基准结果JSON文件")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="判定退化的相对容差")
+    args = parser.parse_args()
+
+    instances = [f"random:{n}:0" for n in args.sizes] + args.tsplib
+    records = run_benchmark(instances, args.solvers, args.seeds, args.time_limit, args.formulation,
+                            args.candidates)
+    save_results(records, args.output)
+    print(f"结果已保存到 {os.path.abspath(args.output)}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(records, args.baseline, args.tolerance)
+        for r in regressions:
+            print(f"性能退化: {r['instance']} {r['solver']} seed={r['seed']} "
+                  f"{r['metric']}: {r['baseline']} -> {r['current']}")
+        if regressions:
+            raise SystemExit(1)
+        print("未发现性能退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+# 只影响求解预算或输出、不影响解的含义的参数，不参与缓存键
+BUDGET_PARAMS = ('time_limit', 'initial_tour', 'trace', 'output_flag')
+
+
+def _array_hash(array, chunk_rows=4096):
+    """按行块计算数组内容的哈希，连同形状和数据类型一起编码"""
+    h = hashlib.sha256(f"{array.shape}|{array.dtype.str}".encode())
+    for start in range(0, max(array.shape[0], 1), chunk_rows):
+        h.update(np.ascontiguousarray(array[start:start + chunk_rows]).tobytes())
+    return h.hexdigest()
+
+
+def instance_fingerprint(dist_matrix, coordinates=None):
+    """实例指纹：稠密距离矩阵按内容哈希；惰性距离矩阵按坐标、距离类型和数据类型哈希"""
+    if isinstance(dist_matrix, np.ndarray):
+        return _array_hash(dist_matrix)
+    if coordinates is None:
+        coordinates = dist_matrix.coordinates
+    h = hashlib.sha256(_array_hash(np.asarray(coordinates)).encode())
+    h.update(f"|{getattr(dist_matrix, 'edge_weight_type', None)}|{getattr(dist_matrix, 'dtype', None)}".encode())
+    return h.hexdigest()
+
+
+def _canonical(value):
+    """把参数值转换为可稳定序列化的形式，数组取内容哈希"""
+    if isinstance(value, np.ndarray):
+        return {'array': _array_hash(value)}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    return value
+
+
+class ResultCache:
+    """磁盘结果缓存：每个(实例, 求解器, 参数)对应一个JSON文件，总大小超过max_bytes时按最近使用时间淘汰
+
+    保存回路、路径长度、界、MIP间隙和是否已证明最优；读取时更新文件时间，作为LRU的使用时间。
+    """
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 ** 2):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, fingerprint, solver, params):
+        """由实例指纹、求解器名称和参数（不含预算类参数）生成缓存键"""
+        params = {k: v for k, v in params.items() if k not in BUDGET_PARAMS}
+        text = json.dumps([fingerprint, solver, _canonical(params)], sort_keys=True, default=repr)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """读取缓存结果，不存在或文件损坏时返回None"""
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, key, results):
+        """保存结果（需含tour和distance），已有结果更优时保留原结果，写入后按大小淘汰"""
+        old = self.get(key)
+        if (old is not None and not results.get('optimal')
+                and (old['optimal'] or old['distance'] <= results['distance'])):
+            return False
+        entry = {
+            'solver': results.get('solver'),
+            'tour': [int(city) for city in results['tour']],
+            'distance': float(results['distance']),
+            'obj_bound': None if results.get('obj_bound') is None else float(results['obj_bound']),
+            'mip_gap': None if results.get('mip_gap') is None else float(results['mip_gap']),
+            'optimal': bool(results.get('optimal')),
+            'solve_time': results.get('solve_time'),
+            'created': time.time(),
+        }
+        # 先写临时文件再原子替换，避免并行进程读到写了一半的文件
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+        return True
+
+    def _evict(self):
+        """总大小超过上限时按最近使用时间从旧到新删除"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """删除全部缓存文件"""
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,223 @@
+import numpy as np
+import scipy.sparse as sp
+
+from local_search import matrix_neighbors
+from subtour import connected_components
+
+try:
+    from scipy.optimize import linprog
+except ImportError:
+    linprog = None
+
+try:
+    from scipy.spatial import Delaunay
+except ImportError:
+    Delaunay = None
+
+
+def normalize_edges(edges):
+    """把无向边整理为i < j、去重并排序的(m, 2)整数数组"""
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    edges = np.sort(edges, axis=1)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    if edges.shape[0] == 0:
+        return edges
+    # 编码为一维整数后排序去重，比按行去重快得多
+    base = edges[:, 1].max() + 1
+    keys = np.sort(edges[:, 0] * base + edges[:, 1])
+    keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+    return np.column_stack([keys // base, keys % base])
+
+
+def all_edges(n):
+    """完全图的全部无向边"""
+    rows, cols = np.triu_indices(n, 1)
+    return np.column_stack([rows, cols]).astype(np.int64)
+
+
+def incidence_matrix(edges, n):
+    """城市-边关联矩阵（n × m），用于度约束"""
+    m = edges.shape[0]
+    arange = np.arange(m)
+    return sp.csr_matrix((np.ones(2 * m), (np.concatenate([edges[:, 0], edges[:, 1]]),
+                                           np.concatenate([arange, arange]))), shape=(n, m))
+
+
+def knn_edges(dist_matrix, k=10):
+    """每个城市与其k个最近邻之间的边，按行块读取距离矩阵，也适用于惰性距离矩阵"""
+    neighbors = matrix_neighbors(dist_matrix, k)
+    rows = np.repeat(np.arange(neighbors.shape[0]), neighbors.shape[1])
+    return normalize_edges(np.column_stack([rows, neighbors.ravel()]))
+
+
+def delaunay_edges(coordinates):
+    """平面坐标的Delaunay三角剖分边（依赖scipy），稀疏且通常包含最优回路的绝大部分边"""
+    if Delaunay is None:
+        raise RuntimeError("Delaunay三角剖分需要安装scipy")
+    simplices = Delaunay(np.asarray(coordinates, dtype=np.float64)[:, :2]).simplices
+    edges = np.concatenate([simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]]])
+    return normalize_edges(edges)
+
+
+def tour_edges(tours):
+    """若干回路的边的并集"""
+    pairs = [np.column_stack([tour, np.roll(tour, -1)]) for tour in (np.asarray(t, dtype=np.int64) for t in tours)]
+    return normalize_edges(np.concatenate(pairs)) if pairs else np.empty((0, 2), dtype=np.int64)
+
+
+def candidate_edges(dist_matrix, candidates, tours=()):
+    """构造候选边集：candidates为整数k时取k近邻边，否则视为给定的边数组；总是并入tours中各回路的边"""
+    if isinstance(candidates, (int, np.integer)):
+        edges = knn_edges(dist_matrix, int(candidates))
+    else:
+        edges = normalize_edges(candidates)
+    return normalize_edges(np.concatenate([edges, tour_edges(tours)]))
+
+
+def nearest_neighbor_tour(dist_matrix, start=0):
+    """最近邻构造回路，按行读取距离矩阵，O(n^2)"""
+    n = dist_matrix.shape[0]
+    visited = np.zeros(n, dtype=bool)
+    tour = np.empty(n, dtype=np.int64)
+    tour[0] = start
+    visited[start] = True
+    for k in range(1, n):
+        row = np.array(dist_matrix[tour[k - 1]], dtype=np.float64)
+        row[visited] = np.inf
+        tour[k] = np.argmin(row)
+        visited[tour[k]] = True
+    return tour
+
+
+def edge_keys(edges, n):
+    """无向边(i < j)的整数编码i * n + j"""
+    return edges[:, 0] * n + edges[:, 1]
+
+
+class EdgePricer:
+    """候选边集上的子回路LP与约简费用定价
+
+    在候选边集上求解度约束+子回路消除约束（按不同阈值下的连通分量启发式分离）的LP松弛，并以列生成方式
+    把约简费用为负的遗漏边加入，直到对偶解对完全图可行。此时LP最优值lower_bound是完全图上的
+    有效下界，任何使用遗漏边e的回路长度都不小于lower_bound + rc(e)，因此只需把
+    lower_bound + rc(e) < 当前最好回路长度的边加入MIP，即可保证稀疏模型的最优解也是完全图上的最优解。
+    """
+
+    def __init__(self, dist_matrix, edges, tol=1e-6, max_columns=None, block_size=1024):
+        if linprog is None:
+            raise RuntimeError("约简费用定价需要安装scipy")
+        self.dist_matrix = dist_matrix
+        self.n = dist_matrix.shape[0]
+        self.tol = tol
+        self.block_size = block_size
+        self.max_columns = max_columns or self.n
+        self.edges = normalize_edges(edges)
+        self.cuts = []
+        self.lower_bound = None
+        self.duals = None
+        self.cut_duals = None
+        self.lp_rounds = 0
+        self._price_out()
+
+    def _solve_lp(self):
+        """在当前边集上求解LP，反复加入子回路割直到找不到违反的子回路约束"""
+        n = self.n
+        edges = self.edges
+        costs = np.asarray(self.dist_matrix[edges[:, 0], edges[:, 1]], dtype=np.float64)
+        incidence = incidence_matrix(edges, n)
+        while True:
+            self.lp_rounds += 1
+            if self.cuts:
+                members = self._membership()
+                inside = members[:, edges[:, 0]].multiply(members[:, edges[:, 1]])
+                a_ub = sp.csr_matrix(inside)
+                b_ub = np.array([len(cut) - 1 for cut in self.cuts], dtype=np.float64)
+            else:
+                a_ub, b_ub = None, None
+            result = linprog(costs, A_ub=a_ub, b_ub=b_ub, A_eq=incidence, b_eq=np.full(n, 2.0),
+                             bounds=(0, 1), method='highs')
+            if result.status != 0:
+                raise RuntimeError(f"定价LP求解失败: {result.message}")
+            cuts = self._separate(result.x)
+            if not cuts:
+                break
+            self.cuts.extend(cuts)
+
+        self.lower_bound = result.fun
+        self.duals = result.eqlin.marginals
+        self.cut_duals = result.ineqlin.marginals if self.cuts else np.empty(0)
+
+    def _separate(self, x):
+        """启发式子回路分离：在取值大于不同阈值的边构成的子图中找连通分量，返回违反子回路约束的分量"""
+        n = self.n
+        edges = self.edges
+        cuts = []
+        seen = set()
+        for threshold in (self.tol, 0.3, 0.5, 0.7):
+            selected = x > threshold
+            for component in connected_components(n, edges[selected]):
+                if len(component) < 3 or len(component) == n:
+                    continue
+                key = tuple(sorted(component))
+                if key in seen:
+                    continue
+                seen.add(key)
+                inside = np.zeros(n, dtype=bool)
+                inside[component] = True
+                # 分量内部边的取值之和超过|S| - 1即违反子回路约束
+                if x[inside[edges[:, 0]] & inside[edges[:, 1]]].sum() > len(component) - 1 + self.tol:
+                    cuts.append(np.array(component, dtype=np.int64))
+        return cuts
+
+    def _membership(self):
+        """子回路割的城市隶属矩阵（割数 × 城市数）"""
+        rows = np.concatenate([np.full(len(cut), k) for k, cut in enumerate(self.cuts)])
+        cols = np.concatenate(self.cuts)
+        return sp.csr_matrix((np.ones(rows.shape[0]), (rows, cols)), shape=(len(self.cuts), self.n))
+
+    def _reduced_costs(self, edges):
+        """按行块生成完全图各边的约简费用，只保留j > i且不在edges中的边，其余位置为inf"""
+        n = self.n
+        edges = normalize_edges(edges)
+        active = np.flatnonzero(self.cut_duals < -self.tol)
+        members = self._membership()[active] if active.shape[0] else None
+        for start in range(0, n, self.block_size):
+            stop = min(start + self.block_size, n)
+            rc = np.array(self.dist_matrix[start:stop], dtype=np.float64)
+            rc -= self.duals[start:stop, None] + self.duals[None, :]
+            if members is not None:
+                # 减去包含该边两个端点的子回路割的对偶值之和
+                weighted = sp.csr_matrix(members[:, start:stop].T.multiply(self.cut_duals[active][None, :]))
+                rc -= (weighted @ members).toarray()
+            rc[np.arange(n)[None, :] <= np.arange(start, stop)[:, None]] = np.inf
+            in_block = (edges[:, 0] >= start) & (edges[:, 0] < stop)
+            rc[edges[in_block, 0] - start, edges[in_block, 1]] = np.inf
+            yield start, rc
+
+    def _omitted(self, edges, threshold):
+        """不在edges中且约简费用小于threshold的边及其约简费用"""
+        found_edges, found_costs = [], []
+        for start, rc in self._reduced_costs(edges):
+            rows, cols = np.nonzero(rc < threshold)
+            found_edges.append(np.column_stack([rows + start, cols]))
+            found_costs.append(rc[rows, cols])
+        return np.concatenate(found_edges).astype(np.int64), np.concatenate(found_costs)
+
+    def _price_out(self):
+        """列生成：加入约简费用为负的遗漏边并重新求解LP，直到没有负约简费用的边"""
+        while True:
+            self._solve_lp()
+            new_edges, costs = self._omitted(self.edges, -self.tol)
+            if new_edges.shape[0] == 0:
+                return
+            order = np.argsort(costs)[:self.max_columns]
+            self.edges = normalize_edges(np.concatenate([self.edges, new_edges[order]]))
+
+    def improving_edges(self, edges, upper_bound):
+        """不在edges中、可能出现在长度小于upper_bound的回路中的边"""
+        new_edges, _ = self._omitted(edges, upper_bound - self.lower_bound - self.tol)
+        return new_edges
+
+    def omitted_bound(self, edges):
+        """使用至少一条不在edges中的边的回路长度下界"""
+        return self.lower_bound + min(rc.min() for _, rc in self._reduced_costs(edges))
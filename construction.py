@@ -0,0 +1,305 @@
+import numpy as np
+
+from candidates import normalize_edges
+from local_search import nearest_neighbors
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+try:
+    import scipy.sparse as sp
+    from scipy.sparse.csgraph import minimum_spanning_tree
+except ImportError:
+    minimum_spanning_tree = None
+
+
+def _points(coordinates):
+    """取前两列坐标"""
+    return np.ascontiguousarray(np.asarray(coordinates, dtype=np.float64)[:, :2])
+
+
+def _lengths(points, edges):
+    """边的欧氏长度"""
+    return np.sqrt(((points[edges[:, 0]] - points[edges[:, 1]]) ** 2).sum(axis=1))
+
+
+def hilbert_keys(coordinates, order=16):
+    """每个城市在2^order × 2^order网格上的Hilbert曲线序号"""
+    points = _points(coordinates)
+    low = points.min(axis=0)
+    span = max((points.max(axis=0) - low).max(), 1e-12)
+    side = 1 << order
+    cells = np.minimum(((points - low) / span * side).astype(np.int64), side - 1)
+    x, y = cells[:, 0].copy(), cells[:, 1].copy()
+    keys = np.zeros(points.shape[0], dtype=np.int64)
+    s = side >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        keys += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # 旋转/翻转象限，使子曲线的方向与父曲线衔接
+        flip = ~ry & rx
+        x[flip] = side - 1 - x[flip]
+        y[flip] = side - 1 - y[flip]
+        swap = ~ry
+        x[swap], y[swap] = y[swap], x[swap]
+        s >>= 1
+    return keys
+
+
+def hilbert_tour(coordinates):
+    """按Hilbert曲线顺序访问城市，O(n log n)，通常比最优回路长约40%"""
+    return np.argsort(hilbert_keys(coordinates), kind='stable').astype(np.int64)
+
+
+def _nearest_neighbor_grid(points, start, cell_size, cells_per_axis, cell_of, order, starts):
+    """在均匀网格上做最近邻构造：按圈扩大搜索范围，已访问的城市从所在网格中交换删除"""
+    n = points.shape[0]
+    count = starts[1:] - starts[:-1]
+    slot = np.empty(n, dtype=np.int64)
+    for k in range(n):
+        slot[order[k]] = k
+    tour = np.empty(n, dtype=np.int64)
+    current = start
+    for step in range(n):
+        tour[step] = current
+        # 删除current：与所在网格的最后一个有效城市交换位置
+        c = cell_of[current]
+        last = starts[c] + count[c] - 1
+        other = order[last]
+        order[slot[current]] = other
+        slot[other] = slot[current]
+        order[last] = current
+        slot[current] = last
+        count[c] -= 1
+        if step == n - 1:
+            break
+
+        cx = cell_of[current] // cells_per_axis
+        cy = cell_of[current] % cells_per_axis
+        best = -1
+        best_d2 = np.inf
+        r = 0
+        while True:
+            for x in range(cx - r, cx + r + 1):
+                if x < 0 or x >= cells_per_axis:
+                    continue
+                # 圈的左右两列取整列，中间各列只取上下两个网格
+                y_step = 1 if (x == cx - r or x == cx + r) else 2 * r
+                for y in range(cy - r, cy + r + 1, y_step):
+                    if y < 0 or y >= cells_per_axis:
+                        continue
+                    cell = x * cells_per_axis + y
+                    for k in range(starts[cell], starts[cell] + count[cell]):
+                        city = order[k]
+                        dx = points[city, 0] - points[current, 0]
+                        dy = points[city, 1] - points[current, 1]
+                        d2 = dx * dx + dy * dy
+                        if d2 < best_d2:
+                            best_d2 = d2
+                            best = city
+            # 第r + 1圈中的城市距离不小于r个网格宽度
+            if best >= 0 and best_d2 <= (r * cell_size) ** 2:
+                break
+            if r > cells_per_axis:
+                break
+            r += 1
+        current = best
+    return tour
+
+
+def nearest_neighbor_tour(coordinates, start=0):
+    """基于网格索引的最近邻构造，每一步只搜索当前城市附近的网格，均匀分布时接近O(n)，通常比最优回路长约25%"""
+    points = _points(coordinates)
+    n = points.shape[0]
+    low = points.min(axis=0)
+    span = max((points.max(axis=0) - low).max(), 1e-12)
+    # 平均每个网格约2个城市
+    cells_per_axis = max(1, int(np.sqrt(n / 2)))
+    cell_size = span / cells_per_axis
+    cell = np.minimum((points - low) // cell_size, cells_per_axis - 1).astype(np.int64)
+    cell_of = cell[:, 0] * cells_per_axis + cell[:, 1]
+    order = np.argsort(cell_of, kind='stable').astype(np.int64)
+    starts = np.searchsorted(cell_of[order], np.arange(cells_per_axis * cells_per_axis + 1)).astype(np.int64)
+    return _nearest_neighbor_grid(points, start, cell_size, cells_per_axis, cell_of, order, starts)
+
+
+def _find(parent, i):
+    """并查集查找（路径减半）"""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _greedy_links(edges, adj, degree, parent, max_degree):
+    """按给定顺序尝试加入边，跳过使端点度数超过max_degree或形成回路的边，返回加入的边数"""
+    added = 0
+    for e in range(edges.shape[0]):
+        i = edges[e, 0]
+        j = edges[e, 1]
+        if degree[i] >= max_degree or degree[j] >= max_degree:
+            continue
+        ri = _find(parent, i)
+        rj = _find(parent, j)
+        if ri == rj:
+            continue
+        parent[ri] = rj
+        adj[i, degree[i]] = j
+        adj[j, degree[j]] = i
+        degree[i] += 1
+        degree[j] += 1
+        added += 1
+    return added
+
+
+def _walk_path(adj, start):
+    """沿度数不超过2的邻接表从端点start走完整条路径"""
+    n = adj.shape[0]
+    tour = np.empty(n, dtype=np.int64)
+    previous = -1
+    current = start
+    for step in range(n):
+        tour[step] = current
+        nxt = adj[current, 0] if adj[current, 0] != previous else adj[current, 1]
+        previous = current
+        current = nxt
+    return tour
+
+
+def _euler_circuit(n, edges, start):
+    """Hierholzer算法求多重图的欧拉回路（所有顶点度数为偶数）"""
+    m = edges.shape[0]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    for e in range(m):
+        offsets[edges[e, 0] + 1] += 1
+        offsets[edges[e, 1] + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    incident = np.empty(2 * m, dtype=np.int64)
+    fill = offsets[:-1].copy()
+    for e in range(m):
+        incident[fill[edges[e, 0]]] = e
+        fill[edges[e, 0]] += 1
+        incident[fill[edges[e, 1]]] = e
+        fill[edges[e, 1]] += 1
+
+    pointer = offsets[:-1].copy()
+    used = np.zeros(m, dtype=np.bool_)
+    stack = np.empty(m + 1, dtype=np.int64)
+    circuit = np.empty(m + 1, dtype=np.int64)
+    stack[0] = start
+    top = 1
+    length = 0
+    while top > 0:
+        v = stack[top - 1]
+        while pointer[v] < offsets[v + 1] and used[incident[pointer[v]]]:
+            pointer[v] += 1
+        if pointer[v] == offsets[v + 1]:
+            circuit[length] = v
+            length += 1
+            top -= 1
+        else:
+            e = incident[pointer[v]]
+            used[e] = True
+            stack[top] = edges[e, 0] + edges[e, 1] - v
+            top += 1
+    return circuit[:length]
+
+
+if HAS_NUMBA:
+    _nearest_neighbor_grid = njit(cache=True)(_nearest_neighbor_grid)
+    _find = njit(cache=True)(_find)
+    _greedy_links = njit(cache=True)(_greedy_links)
+    _walk_path = njit(cache=True)(_walk_path)
+    _euler_circuit = njit(cache=True)(_euler_circuit)
+
+
+def _greedy_pass(points, nodes, k, adj, degree, parent, max_degree):
+    """在nodes之间的k近邻边上按长度升序做一轮贪心连边"""
+    k = min(k, nodes.shape[0] - 1)
+    neighbors = nodes[nearest_neighbors(points[nodes], k)]
+    edges = np.column_stack([np.repeat(nodes, k), neighbors.ravel()]).astype(np.int64)
+    edges = edges[np.argsort(_lengths(points, edges), kind='stable')]
+    return _greedy_links(edges, adj, degree, parent, max_degree)
+
+
+def greedy_tour(coordinates, k=10):
+    """贪心边构造：按长度升序加入k近邻边（度数不超过2且不成环），再在剩余路径端点之间逐轮加大k连接，
+    通常比最优回路长约15%
+    """
+    points = _points(coordinates)
+    n = points.shape[0]
+    if n <= 3:
+        return np.arange(n, dtype=np.int64)
+    adj = np.full((n, 2), -1, dtype=np.int64)
+    degree = np.zeros(n, dtype=np.int64)
+    parent = np.arange(n, dtype=np.int64)
+    links = _greedy_pass(points, np.arange(n, dtype=np.int64), k, adj, degree, parent, 2)
+    while links < n - 1:
+        # 只在路径端点（含孤立城市）之间连边，候选边数随端点数减少
+        links += _greedy_pass(points, np.flatnonzero(degree < 2), k, adj, degree, parent, 2)
+        k *= 2
+    return _walk_path(adj, int(np.flatnonzero(degree < 2)[0]))
+
+
+def _spanning_graph_edges(points, k=10):
+    """k近邻边加Hilbert顺序相邻边构成的连通稀疏图，其最小生成树近似欧氏最小生成树"""
+    n = points.shape[0]
+    k = min(k, n - 1)
+    order = hilbert_tour(points)
+    return normalize_edges(np.concatenate([
+        np.column_stack([np.repeat(np.arange(n), k), nearest_neighbors(points, k).ravel()]),
+        np.column_stack([order[:-1], order[1:]])]))
+
+
+def christofides_tour(coordinates, k=10):
+    """简化的Christofides构造：最小生成树 + 奇度顶点的贪心匹配（代替最小权完美匹配）+ 欧拉回路取捷径
+
+    最小生成树在k近邻边和Hilbert顺序相邻边构成的稀疏图上求得（依赖scipy），整体O(n log n)，
+    通常比最优回路长约20%。
+    """
+    if minimum_spanning_tree is None:
+        raise RuntimeError("Christofides构造需要安装scipy")
+    points = _points(coordinates)
+    n = points.shape[0]
+    if n <= 3:
+        return np.arange(n, dtype=np.int64)
+    edges = _spanning_graph_edges(points, k)
+    # 重合城市间的边长为0，scipy会把它当作不存在的边，因此加上一个极小值
+    weights = np.maximum(_lengths(points, edges), np.finfo(np.float64).tiny)
+    tree = minimum_spanning_tree(sp.csr_matrix((weights, (edges[:, 0], edges[:, 1])), shape=(n, n))).tocoo()
+    tree_edges = np.column_stack([tree.row, tree.col]).astype(np.int64)
+
+    degree = np.bincount(tree_edges.ravel(), minlength=n)
+    odd = np.flatnonzero(degree % 2 == 1)
+    adj = np.full((n, 2), -1, dtype=np.int64)
+    matched = np.zeros(n, dtype=np.int64)
+    parent = np.arange(n, dtype=np.int64)
+    pairs = 0
+    while pairs < odd.shape[0] // 2:
+        pairs += _greedy_pass(points, odd[matched[odd] == 0], k, adj, matched, parent, 1)
+        k *= 2
+    matching = np.column_stack([odd, adj[odd, 0]])
+    matching = matching[matching[:, 0] < matching[:, 1]]
+
+    circuit = _euler_circuit(n, np.concatenate([tree_edges, matching]), 0)
+    _, first = np.unique(circuit, return_index=True)
+    return circuit[np.sort(first)].astype(np.int64)
+
+
+def construct_tour(method, coordinates, seed=None):
+    """按名称构造初始回路：'hilbert'、'nearest_neighbor'（起点由seed随机选取）、'greedy'或'christofides'"""
+    if method == 'hilbert':
+        return hilbert_tour(coordinates)
+    if method == 'nearest_neighbor':
+        start = 0 if seed is None else int(np.random.default_rng(seed).integers(len(coordinates)))
+        return nearest_neighbor_tour(coordinates, start)
+    if method == 'greedy':
+        return greedy_tour(coordinates)
+    if method == 'christofides':
+        return christofides_tour(coordinates)
+    raise ValueError(f"未知的构造方法: {method}，可选: hilbert, nearest_neighbor, greedy, christofides")
@@ -1,13 +1,152 @@
+import hashlib
+import json
+import os
+
 import numpy as np
 
+# TSPLIB中EXPLICIT格式各矩阵存储方式对应的下标（对称矩阵中按列存储等价于另一三角按行存储）
+_EXPLICIT_FORMATS = {
+    'UPPER_ROW': (np.triu_indices, 1), 'LOWER_COL': (np.triu_indices, 1),
+    'LOWER_ROW': (np.tril_indices, -1), 'UPPER_COL': (np.tril_indices, -1),
+    'UPPER_DIAG_ROW': (np.triu_indices, 0), 'LOWER_DIAG_COL': (np.triu_indices, 0),
+    'LOWER_DIAG_ROW': (np.tril_indices, 0), 'UPPER_DIAG_COL': (np.tril_indices, 0),
+}
+
+
+def pairwise_distances(a, b, edge_weight_type=None):
+    """计算两组可广播坐标之间的距离
+
+    edge_weight_type为None时为未取整的欧氏距离，否则按TSPLIB规定的
+    EUC_2D、CEIL_2D、ATT、GEO距离函数计算。
+    """
+    dx = a[..., 0] - b[..., 0]
+    dy = a[..., 1] - b[..., 1]
+    if edge_weight_type is None:
+        return np.sqrt(dx ** 2 + dy ** 2)
+    if edge_weight_type == 'EUC_2D':
+        return np.floor(np.sqrt(dx ** 2 + dy ** 2) + 0.5)
+    if edge_weight_type == 'CEIL_2D':
+        return np.ceil(np.sqrt(dx ** 2 + dy ** 2))
+    if edge_weight_type == 'ATT':
+        r = np.sqrt((dx ** 2 + dy ** 2) / 10.0)
+        t = np.floor(r + 0.5)
+        return np.where(t < r, t + 1, t)
+    if edge_weight_type == 'GEO':
+        lat_a, lon_a = _geo_radians(a[..., 0]), _geo_radians(a[..., 1])
+        lat_b, lon_b = _geo_radians(b[..., 0]), _geo_radians(b[..., 1])
+        q1 = np.cos(lon_a - lon_b)
+        q2 = np.cos(lat_a - lat_b)
+        q3 = np.cos(lat_a + lat_b)
+        cos_d = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+        dist = np.floor(6378.388 * np.arccos(cos_d) + 1.0)
+        # TSPLIB公式对同一点给出1，这里统一为0
+        return np.where((dx == 0) & (dy == 0), 0.0, dist)
+    raise ValueError(f"不支持的距离类型: {edge_weight_type}")
+
+
+def _geo_radians(value):
+    """将TSPLIB GEO格式的“度.分”坐标转换为弧度"""
+    degrees = np.trunc(value)
+    return 3.141592 * (degrees + 5.0 * (value - degrees) / 3.0) / 180.0
+
+
+def _file_hash(path, chunk_size=1 << 20):
+    """按块读取文件计算内容哈希"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_tsplib(path):
+    """流式解析TSPLIB .tsp文件，返回(头部字典, 坐标, 显式距离矩阵)"""
+    header = {}
+    coordinates = None
+    explicit = None
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line == 'EOF':
+                continue
+            if ':' in line:
+                key, value = line.split(':', 1)
+                header[key.strip().upper()] = value.strip()
+                continue
+            section = line.upper()
+            n = int(header['DIMENSION'])
+            if section in ('NODE_COORD_SECTION', 'DISPLAY_DATA_SECTION'):
+                # 每行为“编号 x y”，直接从文件句柄读取固定行数
+                rows = np.loadtxt(f, max_rows=n, ndmin=2)
+                if coordinates is None or section == 'NODE_COORD_SECTION':
+                    coordinates = rows[:, 1:3].astype(np.float64)
+            elif section == 'EDGE_WEIGHT_SECTION':
+                explicit = _read_explicit_weights(f, n, header.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX'))
+            else:
+                raise ValueError(f"不支持的TSPLIB数据段: {section}")
+    return header, coordinates, explicit
+
+
+def _read_explicit_weights(f, n, weight_format):
+    """从文件句柄中读取EXPLICIT格式的边权并还原为完整对称矩阵"""
+    if weight_format == 'FULL_MATRIX':
+        count = n * n
+    elif weight_format in _EXPLICIT_FORMATS:
+        indices, k = _EXPLICIT_FORMATS[weight_format]
+        rows, cols = indices(n, k)
+        count = rows.shape[0]
+    else:
+        raise ValueError(f"不支持的EDGE_WEIGHT_FORMAT: {weight_format}")
+
+    def tokens():
+        for line in f:
+            yield from line.split()
+
+    values = np.fromiter((float(v) for v in tokens()), dtype=np.float64, count=count)
+    if weight_format == 'FULL_MATRIX':
+        return values.reshape(n, n)
+    dist_matrix = np.zeros((n, n))
+    dist_matrix[rows, cols] = values
+    dist_matrix[cols, rows] = values
+    return dist_matrix
+
+
+class LazyDistanceMatrix:
+    """不实际存储的距离矩阵，按下标访问时根据坐标即时计算距离"""
+
+    def __init__(self, coordinates, dtype=np.float64, edge_weight_type=None):
+        self.coordinates = coordinates
+        self.dtype = np.dtype(dtype)
+        self.edge_weight_type = edge_weight_type
+        self.shape = (coordinates.shape[0], coordinates.shape[0])
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        """支持与numpy数组一致的整数、整数数组和切片下标"""
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        i, j = key
+        a = self.coordinates[i]
+        b = self.coordinates[j]
+        if (isinstance(i, slice) or isinstance(j, slice)) and a.ndim == 2 and b.ndim == 2:
+            # 含切片时按外积方式组合行与列
+            a = a[:, None, :]
+        return pairwise_distances(a, b, self.edge_weight_type).astype(self.dtype, copy=False)
+
 
 class TSPData:
     def __init__(self):
         self.coordinates = None
         self.dist_matrix = None
         self.n = 0
+        self.name = None
+        self.edge_weight_type = None
+        # 增量修改时使用的预留容量距离矩阵（增加城市时扩容，删除城市后为原矩阵），dist_matrix为其左上角视图
+        self._buffer = None
 
-    def load_default_data(self):
+    def load_default_data(self, dtype=np.float64, lazy=False, out=None):
         """加载默认的城市坐标数据"""
         self.coordinates = np.array([
             [565.0, 575.0], [25.0, 185.0], [345.0, 750.0],
@@ -29,27 +168,239 @@ class TSPData:
             [605.0, 625.0], [595.0, 360.0], [1340.0, 725.0],
             [1740.0, 245.0]
         ])
-        self.n = self.coordinates.shape[0]
-        self.dist_matrix = self.compute_distance_matrix(self.coordinates)
+        self.name = None
+        self.edge_weight_type = None
+        self._build_distances(dtype, lazy, out)
         return self
 
-    def load_custom_data(self, coordinates):
-        """加载自定义的城市坐标数据"""
+    def load_custom_data(self, coordinates, dtype=np.float64, lazy=False, out=None):
+        """加载自定义的城市坐标数据
+
+        dtype指定距离矩阵的数据类型（如np.float32以减半内存），out为文件路径时
+        距离矩阵写入内存映射文件；lazy=True时不生成距离矩阵，求解器按需根据坐标计算距离。
+        """
         self.coordinates = np.array(coordinates)
-        self.n = self.coordinates.shape[0]
-        self.dist_matrix = self.compute_distance_matrix(self.coordinates)
+        self.name = None
+        self.edge_weight_type = None
+        self._build_distances(dtype, lazy, out)
         return self
 
-    def compute_distance_matrix(self, coords):
-        """计算距离矩阵"""
+    def load_file(self, path, dtype=np.float64, lazy=False, cache_dir=None):
+        """从文件加载数据，支持TSPLIB .tsp文件以及.csv/.txt/.npy坐标文件
+
+        指定cache_dir时，解析得到的坐标和距离矩阵以.npy格式缓存，缓存键为文件内容哈希，
+        再次加载同一实例时直接以内存映射方式读取，跳过解析和距离矩阵计算。
+        """
+        key = None
+        if cache_dir is not None:
+            key = f"{_file_hash(path)}_{np.dtype(dtype).name}"
+            if self._load_cache(cache_dir, key, dtype, lazy):
+                return self
+
+        explicit = None
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        if path.lower().endswith('.tsp'):
+            header, self.coordinates, explicit = _read_tsplib(path)
+            self.name = header.get('NAME', self.name)
+            weight_type = header.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+            self.edge_weight_type = None if weight_type == 'EXPLICIT' else weight_type
+            if explicit is None and weight_type not in ('EUC_2D', 'CEIL_2D', 'ATT', 'GEO'):
+                raise ValueError(f"不支持的EDGE_WEIGHT_TYPE: {weight_type}")
+        else:
+            self.coordinates = self._read_coordinates(path)
+            self.edge_weight_type = None
+
+        if explicit is not None:
+            # 显式给出的边权只能以完整矩阵形式保存
+            self.n = explicit.shape[0]
+            self.dist_matrix = explicit.astype(dtype, copy=False)
+        else:
+            out = None
+            if key is not None and not lazy:
+                os.makedirs(cache_dir, exist_ok=True)
+                out = os.path.join(cache_dir, f"{key}.dist.npy")
+            self._build_distances(dtype, lazy, out)
+
+        if key is not None:
+            self._save_cache(cache_dir, key, explicit is not None)
+        return self
+
+    @staticmethod
+    def _read_coordinates(path):
+        """读取.npy或文本格式的坐标文件，文本文件可带表头，只取前两列"""
+        if path.lower().endswith('.npy'):
+            return np.load(path, mmap_mode='r')[:, :2]
+        delimiter = ',' if path.lower().endswith('.csv') else None
+        with open(path) as f:
+            first = f.readline().replace(',', ' ').split()
+        try:
+            [float(v) for v in first]
+            skiprows = 0
+        except ValueError:
+            skiprows = 1
+        return np.loadtxt(path, delimiter=delimiter, skiprows=skiprows, usecols=(0, 1), ndmin=2)
+
+    def _save_cache(self, cache_dir, key, has_explicit):
+        """把坐标、距离矩阵和元信息写入缓存目录"""
+        os.makedirs(cache_dir, exist_ok=True)
+        if self.coordinates is not None:
+            np.save(os.path.join(cache_dir, f"{key}.coords.npy"), np.asarray(self.coordinates))
+        if has_explicit:
+            np.save(os.path.join(cache_dir, f"{key}.dist.npy"), self.dist_matrix)
+        meta = {'name': self.name, 'n': self.n, 'edge_weight_type': self.edge_weight_type}
+        with open(os.path.join(cache_dir, f"{key}.json"), 'w') as f:
+            json.dump(meta, f)
+
+    def _load_cache(self, cache_dir, key, dtype, lazy):
+        """尝试从缓存目录加载实例，缓存不完整时返回False"""
+        meta_path = os.path.join(cache_dir, f"{key}.json")
+        coords_path = os.path.join(cache_dir, f"{key}.coords.npy")
+        dist_path = os.path.join(cache_dir, f"{key}.dist.npy")
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        coordinates = np.load(coords_path, mmap_mode='r') if os.path.exists(coords_path) else None
+        if os.path.exists(dist_path):
+            dist_matrix = np.load(dist_path, mmap_mode='r')
+        elif lazy and coordinates is not None:
+            dist_matrix = LazyDistanceMatrix(coordinates, dtype, meta['edge_weight_type'])
+        else:
+            return False
+
+        self.name = meta['name']
+        self.n = meta['n']
+        self.edge_weight_type = meta['edge_weight_type']
+        self.coordinates = coordinates
+        self.dist_matrix = dist_matrix
+        return True
+
+    def _build_distances(self, dtype, lazy, out):
+        """根据当前坐标生成距离矩阵或惰性距离对象"""
+        self.n = self.coordinates.shape[0]
+        if lazy:
+            self.dist_matrix = LazyDistanceMatrix(self.coordinates, dtype, self.edge_weight_type)
+        else:
+            self.dist_matrix = self.compute_distance_matrix(self.coordinates, dtype, out=out,
+                                                            edge_weight_type=self.edge_weight_type)
+
+    def _check_incremental(self):
+        """增量修改要求实例由坐标给出"""
+        if self.coordinates is None:
+            raise ValueError("显式边权实例没有坐标，不支持增量修改")
+
+    def _own_matrix(self):
+        """原地修改前保证距离矩阵为私有的可写数组
+
+        内存映射（如cache_dir中的缓存文件）或只读的矩阵先复制一份，避免修改写回共享的文件。
+        """
+        matrix = self.dist_matrix
+        if isinstance(matrix, np.memmap) or not matrix.flags.writeable:
+            self.dist_matrix = np.array(matrix)
+            self._buffer = None
+
+    def _reserve(self, n):
+        """保证距离矩阵缓冲区至少容纳n个城市，不足时按1.5倍扩容并复制现有矩阵，只在增加城市时调用"""
+        buffer = self._buffer
+        if buffer is not None and self.dist_matrix.base is buffer and buffer.shape[0] >= n:
+            return buffer
+        capacity = max(n, int(1.5 * self.n))
+        buffer = np.empty((capacity, capacity), dtype=self.dist_matrix.dtype)
+        buffer[:self.n, :self.n] = self.dist_matrix
+        self._buffer = buffer
+        return buffer
+
+    def _update_rows(self, cities):
+        """重新计算cities所在的行和列"""
+        coords = np.asarray(self.coordinates)
+        rows = pairwise_distances(coords[cities][:, None, :], coords[None, :, :], self.edge_weight_type)
+        self.dist_matrix[cities, :] = rows
+        self.dist_matrix[:, cities] = rows.T
+
+    def _refresh(self, coordinates, dtype):
+        """更新坐标后同步城市数，惰性距离矩阵按新坐标重建"""
+        self.coordinates = coordinates
+        self.n = coordinates.shape[0]
+        if not isinstance(self.dist_matrix, np.ndarray):
+            self.dist_matrix = LazyDistanceMatrix(coordinates, dtype, self.edge_weight_type)
+
+    def add_cities(self, coordinates):
+        """追加城市，只计算新城市所在的行和列（按1.5倍预留容量，摊还代价与城市数成正比），返回新城市的编号"""
+        self._check_incremental()
+        new = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        old_n = self.n
+        cities = np.arange(old_n, old_n + new.shape[0])
+        dtype = self.dist_matrix.dtype
+        if isinstance(self.dist_matrix, np.ndarray):
+            self.dist_matrix = self._reserve(old_n + new.shape[0])[:old_n + new.shape[0], :old_n + new.shape[0]]
+        self._refresh(np.concatenate([np.asarray(self.coordinates, dtype=np.float64)[:, :2], new]), dtype)
+        if isinstance(self.dist_matrix, np.ndarray):
+            self._update_rows(cities)
+        return cities
+
+    def remove_cities(self, cities):
+        """删除城市：用编号最大的剩余城市填补被删除的位置，只原地移动对应的行和列，不复制整个矩阵
+
+        返回旧编号到新编号的映射数组，被删除的城市映射为-1。
+        """
+        self._check_incremental()
+        cities = np.unique(np.asarray(cities, dtype=np.int64))
+        n = self.n - cities.shape[0]
+        mapping = np.arange(self.n)
+        mapping[cities] = -1
+        holes = cities[cities < n]
+        movers = np.flatnonzero(mapping[n:] >= 0) + n
+        mapping[movers] = holes
+        coordinates = np.array(self.coordinates, dtype=np.float64)[:, :2]
+        coordinates[holes] = coordinates[movers]
+        dtype = self.dist_matrix.dtype
+        if isinstance(self.dist_matrix, np.ndarray):
+            # 原地压缩到左上角，原矩阵的存储保留为之后增加城市时的预留容量
+            self._own_matrix()
+            matrix = self.dist_matrix
+            matrix[holes, :] = matrix[movers, :]
+            matrix[:, holes] = matrix[:, movers]
+            if self._buffer is None or matrix.base is not self._buffer:
+                self._buffer = matrix
+            self.dist_matrix = matrix[:n, :n]
+        self._refresh(coordinates[:n], dtype)
+        return mapping
+
+    def move_cities(self, cities, coordinates):
+        """修改城市坐标，原地重新计算这些城市所在的行和列"""
+        self._check_incremental()
+        cities = np.asarray(cities, dtype=np.int64)
+        updated = np.array(self.coordinates, dtype=np.float64)[:, :2]
+        updated[cities] = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        if isinstance(self.dist_matrix, np.ndarray):
+            self._own_matrix()
+        self._refresh(updated, self.dist_matrix.dtype)
+        if isinstance(self.dist_matrix, np.ndarray):
+            self._update_rows(cities)
+
+    def compute_distance_matrix(self, coords, dtype=np.float64, out=None, block_size=1024, edge_weight_type=None):
+        """分块向量化计算距离矩阵
+
+        每次只计算block_size×block_size的子块，临时内存与城市数无关；
+        out可以是预分配的数组或文件路径（写入.npy内存映射文件）。
+        """
         n = coords.shape[0]
-        dist_matrix = np.zeros((n, n))
-        for i in range(n):
-            for j in range(i + 1, n):
-                dist = np.sqrt((coords[i, 0] - coords[j, 0]) ** 2 +
-                               (coords[i, 1] - coords[j, 1]) ** 2)
-                dist_matrix[i, j] = dist
-                dist_matrix[j, i] = dist
+        if out is None:
+            dist_matrix = np.empty((n, n), dtype=dtype)
+        elif isinstance(out, np.ndarray):
+            dist_matrix = out
+        else:
+            dist_matrix = np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=(n, n))
+
+        for i in range(0, n, block_size):
+            rows = np.asarray(coords[i:i + block_size, None, :])
+            for j in range(0, n, block_size):
+                cols = np.asarray(coords[None, j:j + block_size, :])
+                dist_matrix[i:i + block_size, j:j + block_size] = pairwise_distances(rows, cols, edge_weight_type)
+
+        if isinstance(dist_matrix, np.memmap):
+            dist_matrix.flush()
         return dist_matrix
 
     def get_data(self):
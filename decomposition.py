@@ -0,0 +1,243 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from data import LazyDistanceMatrix, pairwise_distances
+from lin_kernighan import LinKernighan
+from local_search import nearest_neighbors
+from solvers import get_solver, run_solver
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+def _assign(points, centers, block_size=4096):
+    """每个点最近的中心，有scipy时使用KD树，否则分块计算距离"""
+    if cKDTree is not None:
+        return cKDTree(centers).query(points)[1]
+    labels = np.empty(points.shape[0], dtype=np.int64)
+    for start in range(0, points.shape[0], block_size):
+        block = points[start:start + block_size]
+        labels[start:start + block_size] = np.argmin(
+            ((block[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2), axis=1)
+    return labels
+
+
+def kmeans_partition(coordinates, cluster_size=1000, iterations=10, seed=None):
+    """k-means空间划分，返回每个城市的簇编号（0..m-1）
+
+    簇数为ceil(n / cluster_size)，中心从城市中随机抽取，迭代iterations次。
+    空簇被去掉，超过2倍cluster_size的簇沿较长坐标轴切分，使每个子问题的规模有上界。
+    """
+    points = np.asarray(coordinates, dtype=np.float64)[:, :2]
+    n = points.shape[0]
+    m = max(1, -(-n // cluster_size))
+    rng = np.random.default_rng(seed)
+    centers = points[rng.choice(n, m, replace=False)]
+    labels = _assign(points, centers)
+    for _ in range(iterations):
+        counts = np.bincount(labels, minlength=m)
+        sums = np.zeros((m, 2))
+        np.add.at(sums, labels, points)
+        occupied = counts > 0
+        centers[occupied] = sums[occupied] / counts[occupied, None]
+        new_labels = _assign(points, centers)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+    return _split_oversized(points, np.unique(labels, return_inverse=True)[1], 2 * cluster_size)
+
+
+def _split_oversized(points, labels, max_size):
+    """把超过max_size的簇沿较长坐标轴按顺序切成不超过max_size的若干段"""
+    result = labels.copy()
+    next_label = labels.max() + 1
+    for label in np.flatnonzero(np.bincount(labels) > max_size):
+        members = np.flatnonzero(labels == label)
+        axis = np.argmax(np.ptp(points[members], axis=0))
+        members = members[np.argsort(points[members, axis], kind='stable')]
+        for start in range(max_size, members.shape[0], max_size):
+            result[members[start:start + max_size]] = next_label
+            next_label += 1
+    return result
+
+
+def grid_partition(coordinates, cluster_size=1000):
+    """网格划分：按蛇形顺序遍历网格单元，把城市依次切成每段cluster_size个的簇"""
+    points = np.asarray(coordinates, dtype=np.float64)[:, :2]
+    n = points.shape[0]
+    # 每个网格单元平均约cluster_size / 4个城市，使相邻的段在空间上较紧凑
+    cells_per_axis = max(1, int(np.sqrt(4 * n / cluster_size)))
+    low = points.min(axis=0)
+    span = np.maximum(points.max(axis=0) - low, 1e-12)
+    cell = np.minimum((points - low) / span * cells_per_axis, cells_per_axis - 1).astype(np.int64)
+    # 奇数列反向遍历，相邻单元在顺序上也相邻
+    row = np.where(cell[:, 0] % 2 == 0, cell[:, 1], cells_per_axis - 1 - cell[:, 1])
+    order = np.lexsort((points[:, 1], row, cell[:, 0]))
+    labels = np.empty(n, dtype=np.int64)
+    labels[order] = np.arange(n) // cluster_size
+    return labels
+
+
+# 各阶段耗时的显示名称
+_STAGE_NAMES = {'partition': '划分', 'clusters': '子问题求解', 'stitch': '拼接', 'repair': '边界修复'}
+
+
+def _solve_cluster(solver, coordinates, edge_weight_type, time_limit, seed, params):
+    """在工作进程中求解一个簇，返回(簇内回路, 结果字典)；簇的距离矩阵只在该进程中生成"""
+    n = coordinates.shape[0]
+    if n <= 3:
+        return np.arange(n, dtype=np.int64), {'solver': solver, 'success': True}
+    dist_matrix = pairwise_distances(coordinates[:, None, :], coordinates[None, :, :], edge_weight_type)
+    results = run_solver(solver, dist_matrix, coordinates, time_limit=time_limit, seed=seed, **params)
+    if not results['success'] or results.get('tour') is None:
+        # 求解失败时退回按坐标顺序的回路，保证仍能拼接出完整回路
+        return np.argsort(coordinates[:, 0], kind='stable'), results
+    return np.asarray(results['tour'], dtype=np.int64), results
+
+
+class TspDecomposition:
+    def __init__(self, coordinates, edge_weight_type=None):
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+        self.edge_weight_type = edge_weight_type
+        self.n = self.coordinates.shape[0]
+        self.tour = None
+        self.distance = None
+        self.solve_time = None
+        self.labels = None
+        self.cluster_results = None
+        self.timings = None
+
+    def _distance(self, a, b):
+        """两组城市之间逐对的距离"""
+        return pairwise_distances(self.coordinates[a], self.coordinates[b], self.edge_weight_type)
+
+    def _cluster_order(self, centers, seed):
+        """簇的访问顺序：在簇中心上求一条Lin-Kernighan回路"""
+        m = centers.shape[0]
+        if m <= 3:
+            return np.arange(m)
+        dist_matrix = pairwise_distances(centers[:, None, :], centers[None, :, :], self.edge_weight_type)
+        solver = LinKernighan(dist_matrix, centers)
+        solver.solve(seed=seed)
+        return solver.tour
+
+    def _stitch(self, tours, order, centers):
+        """按簇顺序拼接子回路：每个子回路断开一条边，使“从上一簇出口进入、向下一簇中心离开”的代价最小"""
+        pieces = []
+        m = len(order)
+        previous = centers[order[-1]]
+        for idx, c in enumerate(order):
+            tour = tours[c]
+            nxt = centers[order[(idx + 1) % m]]
+            succ = np.roll(tour, -1)
+            points = self.coordinates
+            removed = self._distance(tour, succ)
+            # 断开(u, v)后可以从v进入、沿回路走到u离开，或反向从u进入、从v离开
+            forward = (pairwise_distances(previous, points[succ], self.edge_weight_type)
+                       + pairwise_distances(points[tour], nxt, self.edge_weight_type) - removed)
+            backward = (pairwise_distances(previous, points[tour], self.edge_weight_type)
+                        + pairwise_distances(points[succ], nxt, self.edge_weight_type) - removed)
+            k = int(np.argmin(np.minimum(forward, backward)))
+            path = np.roll(tour, -(k + 1))
+            if backward[k] < forward[k]:
+                path = path[::-1]
+            pieces.append(path)
+            previous = points[path[-1]]
+        return np.concatenate(pieces)
+
+    def _boundary_cities(self, neighbors, labels, tour):
+        """修复区域：近邻中有其他簇城市的城市，以及簇之间连接边的端点"""
+        boundary = (labels[neighbors] != labels[:, None]).any(axis=1)
+        joins = np.flatnonzero(labels[tour] != labels[np.roll(tour, -1)])
+        boundary[tour[joins]] = True
+        boundary[tour[(joins + 1) % self.n]] = True
+        return np.flatnonzero(boundary)
+
+    def solve(self, solver='lk', cluster_size=1000, partition='kmeans', time_limit=None, params=None, workers=None,
+              seed=None, repair=True, k=10):
+        """分解求解大规模实例
+
+        按partition（'kmeans'或'grid'）把城市划分为每簇约cluster_size个的子问题，在workers个进程中用注册表中的
+        求解器solver分别求解（time_limit为每个子问题的时间限制，params为solve参数），按簇中心回路的顺序拼接子回路，
+        最后在簇边界附近用Lin-Kernighan做局部修复。每个进程只生成本簇的距离矩阵，从不生成完整距离矩阵。
+        workers为1时在当前进程中依次求解。
+        """
+        start_time = time.time()
+        get_solver(solver)
+        if partition not in ('kmeans', 'grid'):
+            raise ValueError(f"未知的划分方式: {partition}，可选: kmeans, grid")
+        params = params or {}
+        timings = {}
+
+        if partition == 'kmeans':
+            labels = kmeans_partition(self.coordinates, cluster_size, seed=seed)
+        else:
+            labels = grid_partition(self.coordinates, cluster_size)
+        m = labels.max() + 1
+        order = np.argsort(labels, kind='stable')
+        members = np.split(order, np.cumsum(np.bincount(labels, minlength=m))[:-1])
+        centers = np.array([self.coordinates[c, :2].mean(axis=0) for c in members])
+        timings['partition'] = time.time() - start_time
+
+        step_time = time.time()
+        seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(m)]
+        tasks = [(solver, self.coordinates[c], self.edge_weight_type, time_limit, seeds[i], dict(params))
+                 for i, c in enumerate(members)]
+        workers = workers or os.cpu_count()
+        if workers == 1:
+            outputs = [_solve_cluster(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, m)) as executor:
+                outputs = list(executor.map(_solve_cluster, *zip(*tasks)))
+        tours = [c[tour] for c, (tour, _) in zip(members, outputs)]
+        self.cluster_results = [results for _, results in outputs]
+        timings['clusters'] = time.time() - step_time
+
+        step_time = time.time()
+        tour = self._stitch(tours, self._cluster_order(centers, seed), centers)
+        timings['stitch'] = time.time() - step_time
+
+        if repair and self.n >= 8:
+            step_time = time.time()
+            lk = LinKernighan(LazyDistanceMatrix(self.coordinates, edge_weight_type=self.edge_weight_type),
+                              self.coordinates, k=k)
+            lk.neighbors = nearest_neighbors(self.coordinates, k)
+            tour = lk.improve(tour, self._boundary_cities(lk.neighbors, labels, tour))
+            timings['repair'] = time.time() - step_time
+
+        end_time = time.time()
+        self.solve_time = end_time - start_time
+        self.labels = labels
+        self.timings = timings
+        self.tour = tour
+        self.distance = float(self._distance(tour, np.roll(tour, -1)).sum())
+
+        return True
+
+    def get_results(self):
+        """获取求解结果，timings为划分、子问题求解、拼接和修复各阶段的耗时"""
+        return {
+            'tour': self.tour,
+            'distance': self.distance,
+            'solve_time': self.solve_time,
+            'n_clusters': None if self.labels is None else int(self.labels.max() + 1),
+            'timings': self.timings,
+            'cluster_results': self.cluster_results
+        }
+
+    def print_results(self):
+        """打印求解结果"""
+        if self.tour is not None:
+            print("分解求解结果:")
+            print(f"路径长度: {self.distance}")
+            print(f"求解时间: {self.solve_time:.2f}秒")
+            print(f"簇数: {self.labels.max() + 1}")
+            for name, elapsed in self.timings.items():
+                print(f"  {_STAGE_NAMES[name]}: {elapsed:.2f}秒")
+        else:
+            print("分解求解未能找到可行解")
@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+
+from lin_kernighan import LinKernighan
+from local_search import LocalSearch
+from solvers import get_solver, run_solver
+
+
+def cheapest_insertion(tour, cities, dist_matrix):
+    """把cities依次插入回路中使长度增加最少的位置，每个城市只读取距离矩阵的一行，O(n)"""
+    tour = np.asarray(tour, dtype=np.int64)
+    for city in np.asarray(cities, dtype=np.int64):
+        if tour.shape[0] < 2:
+            tour = np.append(tour, city)
+            continue
+        row = np.asarray(dist_matrix[city], dtype=np.float64)
+        succ = np.roll(tour, -1)
+        cost = row[tour] + row[succ] - np.asarray(dist_matrix[tour, succ], dtype=np.float64)
+        k = int(np.argmin(cost))
+        tour = np.insert(tour, k + 1, city)
+    return tour
+
+
+def tour_neighbors(tour, cities):
+    """cities在回路中的前驱和后继"""
+    pos = np.empty(tour.shape[0], dtype=np.int64)
+    pos[tour] = np.arange(tour.shape[0])
+    index = pos[np.asarray(cities, dtype=np.int64)]
+    return np.concatenate([tour[index - 1], tour[(index + 1) % tour.shape[0]]])
+
+
+class TspIncremental:
+    """在已有回路上处理城市的增加、删除和移动
+
+    距离矩阵通过TSPData的增量方法只更新受影响的行和列，新城市按最便宜插入加入回路，
+    再只从受影响的城市出发做局部修复：repair为'lk'或'local_search'时使用有界的局部搜索，
+    为精确求解器名称（如'gurobi'）时以当前回路为初始解运行repair_time秒的MIP，为None时不修复。
+    """
+
+    def __init__(self, data, tour, repair='lk', k=10, repair_time=1.0, repair_params=None):
+        if repair not in (None, 'lk', 'local_search') and not get_solver(repair).exact:
+            raise ValueError(f"repair只能为None、'lk'、'local_search'或精确求解器名称: {repair}")
+        self.data = data
+        self.tour = np.array(tour, dtype=np.int64)
+        self.repair = repair
+        self.k = k
+        self.repair_time = repair_time
+        self.repair_params = repair_params or {}
+        self.distance = self._length()
+        self.solve_time = None
+        self.updates = 0
+
+    def _length(self):
+        """当前回路长度"""
+        return float(np.sum(self.data.dist_matrix[self.tour, np.roll(self.tour, -1)]))
+
+    def _repair(self, cities):
+        """从受影响的城市出发修复回路"""
+        data = self.data
+        cities = np.unique(cities)
+        if self.repair is None or data.n < 8:
+            return
+        if self.repair == 'lk':
+            self.tour = LinKernighan(data.dist_matrix, data.coordinates, self.k).improve(self.tour, cities)
+        elif self.repair == 'local_search':
+            self.tour = LocalSearch(data.dist_matrix, data.coordinates, self.k).improve(self.tour, cities=cities)
+        else:
+            results = run_solver(self.repair, data.dist_matrix, data.coordinates, time_limit=self.repair_time,
+                                 initial_tour=self.tour, **self.repair_params)
+            if results['success'] and results.get('tour') is not None and results['distance'] < self._length():
+                self.tour = np.asarray(results['tour'], dtype=np.int64)
+
+    def _finish(self, start_time):
+        """记录本次更新的耗时和新的回路长度"""
+        self.distance = self._length()
+        self.solve_time = time.time() - start_time
+        self.updates += 1
+
+    def add_cities(self, coordinates):
+        """增加城市并插入回路，返回新城市的编号"""
+        start_time = time.time()
+        cities = self.data.add_cities(coordinates)
+        self.tour = cheapest_insertion(self.tour, cities, self.data.dist_matrix)
+        self._repair(np.concatenate([cities, tour_neighbors(self.tour, cities)]))
+        self._finish(start_time)
+        return cities
+
+    def remove_cities(self, cities):
+        """删除城市，返回旧编号到新编号的映射（被删除的城市为-1）"""
+        start_time = time.time()
+        cities = np.asarray(cities, dtype=np.int64)
+        # 被删除城市在回路中的前后城市需要重新连接，是修复的出发点
+        touched = tour_neighbors(self.tour, cities)
+        mapping = self.data.remove_cities(cities)
+        self.tour = mapping[self.tour[mapping[self.tour] >= 0]]
+        touched = mapping[touched]
+        self._repair(touched[touched >= 0])
+        self._finish(start_time)
+        return mapping
+
+    def move_cities(self, cities, coordinates):
+        """修改城市坐标，把这些城市从回路中取出后重新插入"""
+        start_time = time.time()
+        cities = np.asarray(cities, dtype=np.int64)
+        touched = tour_neighbors(self.tour, cities)
+        self.data.move_cities(cities, coordinates)
+        self.tour = cheapest_insertion(self.tour[~np.isin(self.tour, cities)], cities, self.data.dist_matrix)
+        self._repair(np.concatenate([cities, touched, tour_neighbors(self.tour, cities)]))
+        self._finish(start_time)
+
+    def get_results(self):
+        """获取求解结果，solve_time为最近一次更新的耗时"""
+        return {
+            'tour': self.tour,
+            'distance': self.distance,
+            'solve_time': self.solve_time,
+            'updates': self.updates
+        }
+
+    def print_results(self):
+        """打印求解结果"""
+        print("增量求解结果:")
+        print(f"最优路径: {[city + 1 for city in self.tour]}")
+        print(f"路径长度: {self.distance}")
+        if self.solve_time is not None:
+            print(f"最近一次更新耗时: {self.solve_time * 1000:.1f}毫秒，累计更新{self.updates}次")
@@ -0,0 +1,365 @@
+import numpy as np
+import time
+
+from candidates import normalize_edges
+from construction import greedy_tour
+from local_search import _dist, _push, kernel_arrays, matrix_neighbors, nearest_neighbors
+from progress import make_trace
+from subtour import greedy_edge_tour
+from tour import build_positions, move_2opt
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def _logged_2opt(tour, pos, log, log_state, a, b, c, d):
+    """执行2-opt移动并记入撤销日志，调用方保证日志还有空位"""
+    move_2opt(tour, pos, a, b, c, d)
+    log[log_state[0], 0] = a
+    log[log_state[0], 1] = b
+    log[log_state[0], 2] = c
+    log[log_state[0], 3] = d
+    log_state[0] += 1
+
+
+def _undo_log(tour, pos, log, log_state):
+    """按相反顺序撤销日志中的全部移动：move_2opt(a, b, c, d)的逆移动为move_2opt(a, c, b, d)"""
+    for k in range(log_state[0] - 1, -1, -1):
+        move_2opt(tour, pos, log[k, 0], log[k, 2], log[k, 1], log[k, 3])
+    log_state[0] = 0
+
+
+def _lk_step(tour, pos, coordinates, dist_matrix, metric, neighbors, t1, max_depth, chain, log, log_state,
+             queue, in_queue, head_tail, eps):
+    """以t1为固定端点做一次变深度搜索，成功时返回总增益，否则返回0且回路不变
+
+    每一层删除边(t1, t2)后从自由端t2连向近邻t3，再删除t3与t4之间的边并临时闭合为(t4, t1)，
+    即一次2-opt移动；链按“新增边最短、删除边最长”的贪心规则延长，保留闭合增益最大的前缀。
+    第一层尝试t2的全部近邻，之后每层只取最好的一个。
+
+    日志中只保留被采用的前缀，失败的尝试不留下记录。log_state[1]为1时扰动需要撤销，
+    日志放不下一条完整的交换链时停止搜索；为0时不需要撤销，日志写满后直接清空。
+    """
+    n = tour.shape[0]
+    n_neighbors = neighbors.shape[1]
+    if log_state[0] + max_depth > log.shape[0]:
+        if log_state[1] == 1:
+            return 0.0
+        log_state[0] = 0
+    log_start = log_state[0]
+    for side in (1, -1):
+        for first in range(n_neighbors):
+            t2 = tour[(pos[t1] + side) % n]
+            gain = _dist(coordinates, dist_matrix, metric, t1, t2)
+            depth = 0
+            best_gain = eps
+            best_depth = 0
+            while depth < max_depth:
+                t1_is_succ = tour[(pos[t2] + 1) % n] == t1
+                best_t3 = -1
+                best_t4 = -1
+                best_score = -np.inf
+                start = first if depth == 0 else 0
+                stop = first + 1 if depth == 0 else n_neighbors
+                for m in range(start, stop):
+                    t3 = neighbors[t2, m]
+                    d23 = _dist(coordinates, dist_matrix, metric, t2, t3)
+                    if gain - d23 <= eps:
+                        break
+                    if t3 == t1:
+                        continue
+                    t4 = tour[(pos[t3] + 1) % n] if t1_is_succ else tour[(pos[t3] - 1) % n]
+                    if t4 == t2 or t4 == t1:
+                        continue
+                    # 本次链中新加入的边不能再被删除
+                    tabu = False
+                    for k in range(depth):
+                        if ((chain[k, 0] == t3 and chain[k, 2] == t4) or
+                                (chain[k, 0] == t4 and chain[k, 2] == t3)):
+                            tabu = True
+                            break
+                    if tabu:
+                        continue
+                    score = _dist(coordinates, dist_matrix, metric, t3, t4) - d23
+                    if score > best_score:
+                        best_score = score
+                        best_t3 = t3
+                        best_t4 = t4
+                if best_t3 < 0:
+                    break
+                # 删除(t2, t1)、(t3, t4)，连接(t2, t3)、(t1, t4)
+                _logged_2opt(tour, pos, log, log_state, t2, t1, best_t3, best_t4)
+                chain[depth, 0] = t2
+                chain[depth, 1] = t1
+                chain[depth, 2] = best_t3
+                chain[depth, 3] = best_t4
+                gain += best_score
+                depth += 1
+                closed = gain - _dist(coordinates, dist_matrix, metric, best_t4, t1)
+                if closed > best_gain:
+                    best_gain = closed
+                    best_depth = depth
+                t2 = best_t4
+
+            # 撤销最优前缀之后的移动，日志截断到该前缀
+            for k in range(depth - 1, best_depth - 1, -1):
+                move_2opt(tour, pos, chain[k, 0], chain[k, 2], chain[k, 1], chain[k, 3])
+            log_state[0] = log_start + best_depth
+            if best_depth > 0:
+                for k in range(best_depth):
+                    for c in range(4):
+                        _push(queue, in_queue, head_tail, chain[k, c])
+                return best_gain
+    return 0.0
+
+
+def _lk_optimize(tour, pos, coordinates, dist_matrix, metric, neighbors, max_depth, chain, log, log_state,
+                 queue, in_queue, head_tail, eps):
+    """从don't-look位队列中的城市出发反复做变深度搜索直到队列为空，返回总增益"""
+    n = tour.shape[0]
+    total = 0.0
+    while head_tail[0] < head_tail[1]:
+        t1 = queue[head_tail[0] % n]
+        head_tail[0] += 1
+        in_queue[t1] = False
+        while True:
+            gain = _lk_step(tour, pos, coordinates, dist_matrix, metric, neighbors, t1, max_depth, chain,
+                            log, log_state, queue, in_queue, head_tail, eps)
+            if gain <= 0:
+                break
+            total += gain
+    return total
+
+
+def _double_bridge(tour, pos, coordinates, dist_matrix, metric, log, log_state, i, len1, len2):
+    """局部双桥扰动：交换位置i之后相邻的两段（长度len1、len2），用三次2-opt移动实现，返回长度变化"""
+    n = tour.shape[0]
+    a = tour[i % n]
+    b = tour[(i + 1) % n]
+    c = tour[(i + len1) % n]
+    d = tour[(i + len1 + 1) % n]
+    e = tour[(i + len1 + len2) % n]
+    f = tour[(i + len1 + len2 + 1) % n]
+    delta = (_dist(coordinates, dist_matrix, metric, a, d) + _dist(coordinates, dist_matrix, metric, e, b)
+             + _dist(coordinates, dist_matrix, metric, c, f) - _dist(coordinates, dist_matrix, metric, a, b)
+             - _dist(coordinates, dist_matrix, metric, c, d) - _dist(coordinates, dist_matrix, metric, e, f))
+    # a b..c d..e f -> a c..b d..e f -> a c..b e..d f -> a d..e b..c f
+    _logged_2opt(tour, pos, log, log_state, a, b, c, d)
+    _logged_2opt(tour, pos, log, log_state, b, d, e, f)
+    _logged_2opt(tour, pos, log, log_state, a, c, d, f)
+    return delta
+
+
+def _iterated_lk(tour, pos, length, coordinates, dist_matrix, metric, neighbors, max_depth, kicks,
+                 chain, log, log_state, queue, in_queue, head_tail, eps):
+    """迭代LK：依次执行kicks中的双桥扰动并重新优化，没有改进时按日志撤销，返回(当前长度, 改进次数)
+
+    日志在每次扰动开始时清空，只记录扰动和被采用的交换链，撤销后回路与扰动前完全相同。
+    """
+    n = tour.shape[0]
+    improvements = 0
+    for t in range(kicks.shape[0]):
+        log_state[0] = 0
+        log_state[1] = 1
+        i = kicks[t, 0]
+        delta = _double_bridge(tour, pos, coordinates, dist_matrix, metric, log, log_state,
+                               i, kicks[t, 1], kicks[t, 2])
+        for offset in (0, 1, kicks[t, 1], kicks[t, 1] + 1, kicks[t, 1] + kicks[t, 2],
+                       kicks[t, 1] + kicks[t, 2] + 1):
+            _push(queue, in_queue, head_tail, tour[(pos[tour[i % n]] + offset) % n])
+        gain = _lk_optimize(tour, pos, coordinates, dist_matrix, metric, neighbors, max_depth, chain,
+                            log, log_state, queue, in_queue, head_tail, eps)
+        new_length = length + delta - gain
+        if new_length < length - eps:
+            improvements += 1
+            length = new_length
+        else:
+            _undo_log(tour, pos, log, log_state)
+    return length, improvements
+
+
+def _tour_length(tour, coordinates, dist_matrix, metric):
+    """回路长度"""
+    n = tour.shape[0]
+    total = 0.0
+    for k in range(n):
+        total += _dist(coordinates, dist_matrix, metric, tour[k], tour[(k + 1) % n])
+    return total
+
+
+if HAS_NUMBA:
+    _logged_2opt = njit(cache=True)(_logged_2opt)
+    _undo_log = njit(cache=True)(_undo_log)
+    _lk_step = njit(cache=True)(_lk_step)
+    _lk_optimize = njit(cache=True)(_lk_optimize)
+    _double_bridge = njit(cache=True)(_double_bridge)
+    _iterated_lk = njit(cache=True)(_iterated_lk)
+    _tour_length = njit(cache=True)(_tour_length)
+
+
+def _new_log(max_depth):
+    """撤销日志：每行为一次2-opt移动(a, b, c, d)，容量足够容纳扰动和多条完整的交换链"""
+    return np.zeros((max(1024, 64 * max_depth), 4), dtype=np.int64)
+
+
+class LinKernighan:
+    def __init__(self, dist_matrix, coordinates=None, k=10):
+        self.dist_matrix = dist_matrix
+        # coordinates为None时近邻表由距离矩阵计算，此时要求距离矩阵为稠密数组
+        self.coordinates = coordinates
+        self.n = dist_matrix.shape[0] if coordinates is None else coordinates.shape[0]
+        self.k = k
+        self.neighbors = None
+        self.tour = None
+        self.distance = None
+        self.solve_time = None
+        self.trials = None
+        self.improvements = None
+        self.trace = None
+
+    def _arrays(self):
+        """内核参数：坐标、距离矩阵（或占位数组）及距离计算方式"""
+        arrays = kernel_arrays(self.dist_matrix, self.coordinates)
+        if self.neighbors is None:
+            self.neighbors = (matrix_neighbors(self.dist_matrix, self.k) if self.coordinates is None
+                              else nearest_neighbors(self.coordinates, self.k))
+        return arrays
+
+    def greedy_tour(self):
+        """在近邻边上用贪心边算法构造初始回路"""
+        if self.coordinates is not None:
+            return greedy_tour(self.coordinates, self.k)
+        self._arrays()
+        rows = np.repeat(np.arange(self.n), self.neighbors.shape[1])
+        edges = normalize_edges(np.column_stack([rows, self.neighbors.ravel()]))
+        return np.array(greedy_edge_tour(self.n, edges, np.zeros(edges.shape[0]), self.dist_matrix),
+                        dtype=np.int64)
+
+    def improve(self, tour, cities=None, max_depth=50, eps=1e-9):
+        """对给定回路做变深度局部搜索直到局部最优，返回改进后的回路
+
+        cities不为None时只从这些城市出发搜索（其余城市的don't-look位初始为置位），用于只修复局部区域。
+        """
+        n = self.n
+        coordinates, dist_matrix, metric = self._arrays()
+        tour = np.array(tour, dtype=np.int64)
+        if n < 8:
+            return tour
+        pos = build_positions(tour)
+        queue = np.empty(n, dtype=np.int64)
+        in_queue = np.zeros(n, dtype=np.bool_)
+        head_tail = np.zeros(2, dtype=np.int64)
+        for city in (tour if cities is None else np.asarray(cities, dtype=np.int64)):
+            _push(queue, in_queue, head_tail, city)
+        _lk_optimize(tour, pos, coordinates, dist_matrix, metric, self.neighbors, max_depth,
+                     np.zeros((max_depth, 4), dtype=np.int64), _new_log(max_depth),
+                     np.zeros(2, dtype=np.int64), queue, in_queue, head_tail, eps)
+        return tour
+
+    def solve(self, initial_tour=None, time_limit=None, max_trials=None, restarts=1, max_depth=50, window=50,
+              batch_size=100, seed=None, trace=False, eps=1e-9):
+        """迭代Lin-Kernighan求解
+
+        从initial_tour（默认为近邻边上的贪心回路）出发先做变深度局部搜索，再反复施加局部双桥扰动并重新优化，
+        结果变差时撤销。每次重启从初始回路出发使用独立的随机数流，总扰动次数max_trials默认为城市数，
+        指定time_limit（秒）时在时限内按批次运行。window为双桥扰动两段长度的上限，max_depth为交换链的最大深度。
+        trace为True或ProgressTrace对象时按批次记录最好解和扰动次数，收到停止请求时返回当前最好解。
+        """
+        start_time = time.time()
+        self.trace = make_trace(trace)
+        n = self.n
+        coordinates, dist_matrix, metric = self._arrays()
+        if initial_tour is None:
+            initial_tour = self.greedy_tour()
+        initial_tour = np.array(initial_tour, dtype=np.int64)
+        if max_trials is None:
+            max_trials = n if time_limit is None else np.iinfo(np.int64).max
+        run_trials = max(1, max_trials // restarts)
+        window = max(1, min(window, (n - 2) // 2))
+
+        chain = np.zeros((max_depth, 4), dtype=np.int64)
+        log = _new_log(max_depth)
+        log_state = np.zeros(2, dtype=np.int64)
+        queue = np.empty(n, dtype=np.int64)
+        in_queue = np.zeros(n, dtype=np.bool_)
+        head_tail = np.zeros(2, dtype=np.int64)
+
+        best_tour, best_length = None, np.inf
+        self.trials = 0
+        self.improvements = 0
+        # 时间和扰动次数在各次重启之间平均分配
+        for r, child in enumerate(np.random.SeedSequence(seed).spawn(restarts)):
+            rng = np.random.default_rng(child)
+            deadline = None if time_limit is None else start_time + time_limit * (r + 1) / restarts
+            tour = initial_tour.copy()
+            pos = build_positions(tour)
+            head_tail[:] = 0
+            for city in tour:
+                _push(queue, in_queue, head_tail, city)
+            log_state[:] = 0
+            length = _tour_length(tour, coordinates, dist_matrix, metric)
+            if n >= 8:
+                # 初始优化不需要撤销，日志写满后直接清空
+                length -= _lk_optimize(tour, pos, coordinates, dist_matrix, metric, self.neighbors, max_depth,
+                                       chain, log, log_state, queue, in_queue, head_tail, eps)
+            run_best, run_length = tour.copy(), length
+
+            trials = 0
+            while n >= 8 and trials < run_trials and (deadline is None or time.time() < deadline):
+                size = int(min(batch_size, run_trials - trials))
+                kicks = np.column_stack([rng.integers(0, n, size),
+                                         rng.integers(1, window + 1, size),
+                                         rng.integers(1, window + 1, size)]).astype(np.int64)
+                length, improved = _iterated_lk(tour, pos, length, coordinates, dist_matrix, metric,
+                                                self.neighbors, max_depth, kicks, chain, log, log_state,
+                                                queue, in_queue, head_tail, eps)
+                trials += size
+                self.improvements += improved
+                if length < run_length:
+                    run_best, run_length = tour.copy(), length
+                if self.trace is not None:
+                    self.trace.record(incumbent=min(run_length, best_length), nodes=self.trials + trials)
+                    if self.trace.stopped():
+                        break
+            self.trials += trials
+
+            # 增量累加存在浮点误差，按完整回路重新计算
+            run_length = _tour_length(run_best, coordinates, dist_matrix, metric)
+            if run_length < best_length:
+                best_tour, best_length = run_best, run_length
+            if self.trace is not None and self.trace.stopped():
+                break
+
+        end_time = time.time()
+        self.solve_time = end_time - start_time
+        self.tour = best_tour
+        self.distance = float(best_length)
+        if self.trace is not None:
+            self.trace.record(incumbent=self.distance, nodes=self.trials, force=True)
+
+        return True
+
+    def get_results(self):
+        """获取求解结果"""
+        return {
+            'tour': self.tour,
+            'distance': self.distance,
+            'solve_time': self.solve_time,
+            'trials': self.trials,
+            'improvements': self.improvements,
+            'trace': self.trace
+        }
+
+    def print_results(self):
+        """打印求解结果"""
+        if self.tour is not None:
+            print("Lin-Kernighan求解结果:")
+            print(f"最优路径: {[city + 1 for city in self.tour]}")
+            print(f"路径长度: {self.distance}")
+            print(f"求解时间: {self.solve_time:.2f}秒")
+            print(f"扰动次数: {self.trials}，改进次数: {self.improvements}")
+        else:
+            print("Lin-Kernighan未能找到可行解")
@@ -0,0 +1,350 @@
+import numpy as np
+import time
+
+from data import _geo_radians
+from progress import make_trace
+from tour import build_positions, move_2opt
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+def nearest_neighbors(coordinates, k=10):
+    """计算每个城市的k个最近邻（按距离升序），有scipy时使用KD树，否则使用网格索引"""
+    coordinates = np.asarray(coordinates, dtype=np.float64)[:, :2]
+    n = coordinates.shape[0]
+    k = min(k, n - 1)
+    if cKDTree is not None:
+        _, index = cKDTree(coordinates).query(coordinates, k + 1)
+        return _drop_self(index, k)
+    return _grid_neighbors(coordinates, k)
+
+
+def matrix_neighbors(dist_matrix, k=10, block_size=1024):
+    """由距离矩阵按行块计算每个城市的k个最近邻（按距离升序），用于没有坐标的实例"""
+    n = dist_matrix.shape[0]
+    k = min(k, n - 1)
+    result = np.empty((n, k), dtype=np.int64)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = np.array(dist_matrix[start:stop], dtype=np.float64)
+        block[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(block, nearest, axis=1), axis=1, kind='stable')
+        result[start:stop] = np.take_along_axis(nearest, order, axis=1)
+    return result
+
+
+def _drop_self(index, k):
+    """从包含自身的近邻结果中去掉城市自身"""
+    n = index.shape[0]
+    keep = index != np.arange(n)[:, None]
+    # 有重合城市时自身可能不在结果中，此时去掉最后一个
+    keep[keep.all(axis=1), -1] = False
+    return index[keep].reshape(n, k).astype(np.int64)
+
+
+def _grid_neighbors(coordinates, k):
+    """基于均匀网格的精确k近邻：逐圈扩大搜索范围直到第k近邻的距离不超过已覆盖的半径"""
+    n = coordinates.shape[0]
+    low = coordinates.min(axis=0)
+    span = np.maximum(coordinates.max(axis=0) - low, 1e-12)
+    # 平均每个网格约2个城市
+    cells_per_axis = max(1, int(np.sqrt(n / 2)))
+    cell_size = span.max() / cells_per_axis
+    cell = np.minimum((coordinates - low) // cell_size, cells_per_axis - 1).astype(np.int64)
+    cell_id = cell[:, 0] * cells_per_axis + cell[:, 1]
+    order = np.argsort(cell_id, kind='stable')
+    starts = np.searchsorted(cell_id[order], np.arange(cells_per_axis * cells_per_axis + 1))
+
+    result = np.empty((n, k), dtype=np.int64)
+    for cx in range(cells_per_axis):
+        for cy in range(cells_per_axis):
+            c = cx * cells_per_axis + cy
+            members = order[starts[c]:starts[c + 1]]
+            if members.shape[0] == 0:
+                continue
+            radius = 0
+            while True:
+                x0, x1 = max(cx - radius, 0), min(cx + radius, cells_per_axis - 1)
+                y0, y1 = max(cy - radius, 0), min(cy + radius, cells_per_axis - 1)
+                candidates = np.concatenate([
+                    order[starts[x * cells_per_axis + y0]:starts[x * cells_per_axis + y1 + 1]]
+                    for x in range(x0, x1 + 1)])
+                covers_all = x0 == 0 and y0 == 0 and x1 == cells_per_axis - 1 and y1 == cells_per_axis - 1
+                if candidates.shape[0] > k:
+                    diff = coordinates[members, None, :] - coordinates[None, candidates, :]
+                    dist = np.sqrt((diff ** 2).sum(axis=2))
+                    dist[members[:, None] == candidates[None, :]] = np.inf
+                    nearest = np.argsort(dist, axis=1, kind='stable')[:, :k]
+                    kth = np.take_along_axis(dist, nearest[:, -1:], axis=1).max()
+                    # 覆盖半径内的城市都已在候选集中时结果是精确的
+                    if covers_all or kth <= radius * cell_size:
+                        result[members] = candidates[nearest]
+                        break
+                elif covers_all:
+                    raise ValueError("城市数量不足以构造近邻表")
+                radius += 1
+    return result
+
+
+# 内核中距离的计算方式以元组长度表示：numba按参数类型为每种方式单独编译内核，_dist中的分支在编译时消去，
+# 查表和欧氏距离的内核与只支持这两种方式时一样快。MATRIX_METRIC表示查稠密矩阵，其余为由坐标计算的距离类型
+MATRIX_METRIC = ()
+_METRICS = {None: (0,), 'EUC_2D': (0,) * 2, 'CEIL_2D': (0,) * 3, 'ATT': (0,) * 4, 'GEO': (0,) * 5}
+
+
+def kernel_arrays(dist_matrix, coordinates):
+    """内核参数：坐标、距离矩阵和距离计算方式metric
+
+    有稠密矩阵时查表，否则按惰性距离矩阵的edge_weight_type由坐标计算（GEO坐标预先换算为弧度），
+    与data.pairwise_distances的结果一致。不使用的参数传入占位数组以保持参数类型一致。
+    """
+    if isinstance(dist_matrix, np.ndarray):
+        metric = MATRIX_METRIC
+    elif coordinates is None:
+        raise ValueError("没有坐标时距离矩阵必须为numpy数组")
+    else:
+        edge_weight_type = getattr(dist_matrix, 'edge_weight_type', None)
+        if edge_weight_type not in _METRICS:
+            raise ValueError(f"不支持的距离类型: {edge_weight_type}")
+        metric = _METRICS[edge_weight_type]
+    matrix = np.asarray(dist_matrix) if metric == MATRIX_METRIC else np.zeros((1, 1))
+    if coordinates is None:
+        return np.zeros((1, 2)), matrix, metric
+    coordinates = np.ascontiguousarray(coordinates[:, :2], dtype=np.float64)
+    if metric == _METRICS['GEO']:
+        coordinates = _geo_radians(coordinates)
+    return coordinates, matrix, metric
+
+
+def _dist(coordinates, dist_matrix, metric, i, j):
+    """两城市之间的距离：metric为MATRIX_METRIC时查表，否则按距离类型由坐标计算"""
+    kind = len(metric)
+    if kind == 0:
+        return dist_matrix[i, j]
+    dx = coordinates[i, 0] - coordinates[j, 0]
+    dy = coordinates[i, 1] - coordinates[j, 1]
+    if kind == 1:
+        return np.sqrt(dx * dx + dy * dy)
+    if kind == 2:
+        # EUC_2D
+        return np.floor(np.sqrt(dx * dx + dy * dy) + 0.5)
+    if kind == 3:
+        # CEIL_2D
+        return np.ceil(np.sqrt(dx * dx + dy * dy))
+    if kind == 4:
+        # ATT
+        r = np.sqrt((dx * dx + dy * dy) / 10.0)
+        t = np.floor(r + 0.5)
+        return t + 1.0 if t < r else t
+    # GEO，坐标为弧度
+    if dx == 0.0 and dy == 0.0:
+        return 0.0
+    q1 = np.cos(dy)
+    q2 = np.cos(dx)
+    q3 = np.cos(coordinates[i, 0] + coordinates[j, 0])
+    cos_d = min(max(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0), 1.0)
+    return np.floor(6378.388 * np.arccos(cos_d) + 1.0)
+
+
+def _push(queue, in_queue, head_tail, city):
+    """把城市加入待检查队列（清除其don't-look位）"""
+    if not in_queue[city]:
+        n = queue.shape[0]
+        queue[head_tail[1] % n] = city
+        head_tail[1] += 1
+        in_queue[city] = True
+
+
+def _try_2opt(tour, pos, coordinates, dist_matrix, metric, neighbors, a, queue, in_queue, head_tail, eps):
+    """以城市a为起点尝试一次改进的2-opt移动，成功返回True"""
+    n = tour.shape[0]
+    for direction in (1, -1):
+        b = tour[(pos[a] + direction) % n]
+        d_ab = _dist(coordinates, dist_matrix, metric, a, b)
+        for m in range(neighbors.shape[1]):
+            c = neighbors[a, m]
+            d_ac = _dist(coordinates, dist_matrix, metric, a, c)
+            if d_ac >= d_ab:
+                break
+            d = tour[(pos[c] + direction) % n]
+            if c == b or d == a:
+                continue
+            delta = (d_ac + _dist(coordinates, dist_matrix, metric, b, d)
+                     - d_ab - _dist(coordinates, dist_matrix, metric, c, d))
+            if delta < -eps:
+                move_2opt(tour, pos, a, b, c, d)
+                for city in (a, b, c, d):
+                    _push(queue, in_queue, head_tail, city)
+                return True
+    return False
+
+
+def _try_or_opt(tour, pos, coordinates, dist_matrix, metric, neighbors, a, max_segment,
+                queue, in_queue, head_tail, eps):
+    """尝试把包含城市a的长度不超过max_segment的片段移动到近邻城市旁（可反向插入），成功返回True"""
+    n = tour.shape[0]
+    for length in range(1, max_segment + 1):
+        for first in (0, 1):
+            # 片段以a开头或以a结尾
+            if first == 0:
+                s1 = a
+                s2 = tour[(pos[a] + length - 1) % n]
+            else:
+                s1 = tour[(pos[a] - length + 1) % n]
+                s2 = a
+            p = tour[(pos[s1] - 1) % n]
+            nx = tour[(pos[s2] + 1) % n]
+            if p == s2 or nx == s1 or p == nx:
+                continue
+            gain = (_dist(coordinates, dist_matrix, metric, p, s1)
+                    + _dist(coordinates, dist_matrix, metric, s2, nx)
+                    - _dist(coordinates, dist_matrix, metric, p, nx))
+            if gain <= eps:
+                continue
+            for end in (s1, s2):
+                for m in range(neighbors.shape[1]):
+                    c = neighbors[end, m]
+                    if _dist(coordinates, dist_matrix, metric, end, c) >= gain:
+                        break
+                    # c不能在片段内
+                    if (pos[c] - pos[s1]) % n < length:
+                        continue
+                    for side in (0, 1):
+                        # 候选插入边(x, y)，y为x的后继
+                        if side == 0:
+                            x, y = c, tour[(pos[c] + 1) % n]
+                        else:
+                            x, y = tour[(pos[c] - 1) % n], c
+                        if (pos[y] - pos[s1]) % n < length or (pos[x] - pos[s1]) % n < length:
+                            continue
+                        d_xy = _dist(coordinates, dist_matrix, metric, x, y)
+                        forward = (_dist(coordinates, dist_matrix, metric, x, s1)
+                                   + _dist(coordinates, dist_matrix, metric, s2, y) - d_xy)
+                        reverse = (_dist(coordinates, dist_matrix, metric, x, s2)
+                                   + _dist(coordinates, dist_matrix, metric, s1, y) - d_xy)
+                        if min(forward, reverse) - gain >= -eps:
+                            continue
+                        # 用至多三次2-opt实现片段移动：先反向插入到x、y之间，需要时再翻转片段
+                        move_2opt(tour, pos, p, s1, x, y)
+                        if x != nx:
+                            move_2opt(tour, pos, p, x, nx, s2)
+                        if forward < reverse and length > 1:
+                            move_2opt(tour, pos, x, s2, s1, y)
+                        for city in (p, nx, s1, s2, x, y):
+                            _push(queue, in_queue, head_tail, city)
+                        return True
+    return False
+
+
+def _local_search(tour, coordinates, dist_matrix, metric, neighbors, or_opt, max_segment, eps, cities):
+    """带don't-look位的2-opt与Or-opt局部搜索，从cities中的城市出发，原地修改tour并返回改进移动次数"""
+    n = tour.shape[0]
+    pos = build_positions(tour)
+    queue = np.empty(n, dtype=np.int64)
+    in_queue = np.zeros(n, dtype=np.bool_)
+    head_tail = np.zeros(2, dtype=np.int64)
+    for i in range(cities.shape[0]):
+        _push(queue, in_queue, head_tail, cities[i])
+
+    moves = 0
+    while head_tail[0] < head_tail[1]:
+        a = queue[head_tail[0] % n]
+        head_tail[0] += 1
+        in_queue[a] = False
+        while True:
+            if _try_2opt(tour, pos, coordinates, dist_matrix, metric, neighbors, a,
+                         queue, in_queue, head_tail, eps):
+                moves += 1
+            elif or_opt and _try_or_opt(tour, pos, coordinates, dist_matrix, metric, neighbors, a,
+                                        max_segment, queue, in_queue, head_tail, eps):
+                moves += 1
+            else:
+                break
+    return moves
+
+
+if HAS_NUMBA:
+    _dist = njit(cache=True)(_dist)
+    _push = njit(cache=True)(_push)
+    _try_2opt = njit(cache=True)(_try_2opt)
+    _try_or_opt = njit(cache=True)(_try_or_opt)
+    _local_search = njit(cache=True)(_local_search)
+
+
+class LocalSearch:
+    def __init__(self, dist_matrix, coordinates=None, k=10):
+        self.dist_matrix = dist_matrix
+        # coordinates为None时近邻表由距离矩阵计算，此时要求距离矩阵为稠密数组
+        self.coordinates = coordinates
+        self.n = dist_matrix.shape[0] if coordinates is None else coordinates.shape[0]
+        self.k = k
+        self.neighbors = None
+        self.tour = None
+        self.distance = None
+        self.solve_time = None
+        self.moves = None
+        self.trace = None
+
+    def improve(self, tour, or_opt=True, max_segment=3, eps=1e-9, cities=None):
+        """对给定回路做2-opt/Or-opt局部搜索直到局部最优，可用于任意求解器结果的后处理
+
+        cities不为None时只从这些城市出发搜索，用于只修复局部区域。
+        """
+        coordinates, dist_matrix, metric = kernel_arrays(self.dist_matrix, self.coordinates)
+        if self.neighbors is None:
+            self.neighbors = (matrix_neighbors(self.dist_matrix, self.k) if self.coordinates is None
+                              else nearest_neighbors(self.coordinates, self.k))
+        tour = np.array(tour, dtype=np.int64)
+        cities = tour if cities is None else np.asarray(cities, dtype=np.int64)
+        self.moves = _local_search(tour, coordinates, dist_matrix, metric, self.neighbors, or_opt, max_segment,
+                                   eps, cities)
+        return tour
+
+    def solve(self, initial_tour=None, or_opt=True, max_segment=3, seed=None, trace=False):
+        """从初始回路（默认随机回路）出发进行局部搜索，trace为True或ProgressTrace对象时记录最终结果"""
+        start_time = time.time()
+        self.trace = make_trace(trace)
+
+        if initial_tour is None:
+            initial_tour = np.random.default_rng(seed).permutation(self.n)
+        tour = self.improve(initial_tour, or_opt, max_segment)
+
+        end_time = time.time()
+        self.solve_time = end_time - start_time
+        self.tour = tour
+        next_tour = np.roll(tour, -1)
+        self.distance = float(np.sum(self.dist_matrix[tour, next_tour]))
+        if self.trace is not None:
+            self.trace.record(incumbent=self.distance, nodes=self.moves, force=True)
+
+        return True
+
+    def get_results(self):
+        """获取求解结果"""
+        return {
+            'tour': self.tour,
+            'distance': self.distance,
+            'solve_time': self.solve_time,
+            'moves': self.moves,
+            'trace': self.trace
+        }
+
+    def print_results(self):
+        """打印求解结果"""
+        if self.tour is not None:
+            print("局部搜索求解结果:")
+            print(f"最优路径: {[city + 1 for city in self.tour]}")
+            print(f"路径长度: {self.distance}")
+            print(f"求解时间: {self.solve_time:.2f}秒")
+        else:
+            print("局部搜索未能找到可行解")
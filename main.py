@@ -5,21 +5,37 @@ from Tsp_SA import TspSA
 from visual import TSPVisualizer
 
 
-def main():
+def main(warm_start=True):
+    """运行三种算法并比较，warm_start为True时用模拟退火的结果作为精确求解器的初始解"""
     # 加载数据
     data_loader = TSPData()
     data_loader.load_default_data()
     coordinates, dist_matrix, n = data_loader.get_data()
 
+    # 使用模拟退火求解
+    print("开始使用模拟退火求解TSP问题...")
+    sa_solver = TspSA(dist_matrix, coordinates)
+    sa_success = sa_solver.solve(
+        a=0.99,
+        t0=97,
+        tf=3,
+        markov_length=10000
+    )
+    sa_results = sa_solver.get_results()
+    sa_solver.print_results()
+
+    initial_tour = sa_results['tour'] if warm_start else None
+
     # 使用Gurobi求解
-    print("开始使用Gurobi求解TSP问题...")
+    print("\n开始使用Gurobi求解TSP问题...")
     gurobi_solver = TspGurobi(dist_matrix, n)
     gurobi_success = gurobi_solver.solve(
         time_limit=1800,
         mip_gap=0.0001,
         presolve=2,
         cuts=3,
-        heuristics=0.1
+        heuristics=0.1,
+        initial_tour=initial_tour
     )
     gurobi_results = gurobi_solver.get_results()
     gurobi_solver.print_results()
@@ -32,23 +48,12 @@ def main():
         mip_gap=0.0001,
         presolve=True,
         cuts=True,
-        heuristics=True
+        heuristics=True,
+        initial_tour=initial_tour
     )
     scip_results = scip_solver.get_results()
     scip_solver.print_results()
 
-    # 使用模拟退火求解
-    print("\n开始使用模拟退火求解TSP问题...")
-    sa_solver = TspSA(dist_matrix, coordinates)
-    sa_success = sa_solver.solve(
-        a=0.99,
-        t0=97,
-        tf=3,
-        markov_length=10000
-    )
-    sa_results = sa_solver.get_results()
-    sa_solver.print_results()
-
     # 比较三种算法
     print("\n" + "=" * 50)
     print("算法比较:")
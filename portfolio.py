@@ -0,0 +1,162 @@
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from solvers import cached_optimum, get_solver, run_solver
+
+
+def _portfolio_worker(name, shm_name, shape, dtype, dist_matrix, coordinates, time_limit, seed, initial_tour,
+                      params, cache, results_queue):
+    """在独立进程中运行一个求解器，把统一格式的结果放入队列"""
+    shm = None
+    try:
+        if shm_name is not None:
+            shm = shared_memory.SharedMemory(name=shm_name)
+            dist_matrix = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        results = run_solver(name, dist_matrix, coordinates, time_limit=time_limit, seed=seed,
+                             initial_tour=initial_tour, cache=cache, **params)
+    except Exception as e:
+        results = {'solver': name, 'success': False, 'error': repr(e)}
+    results_queue.put(results)
+    if shm is not None:
+        del dist_matrix
+        shm.close()
+
+
+class TspPortfolio:
+    def __init__(self, dist_matrix, coordinates):
+        self.dist_matrix = dist_matrix
+        self.coordinates = coordinates
+        self.n = coordinates.shape[0]
+        self.tour = None
+        self.distance = None
+        self.solve_time = None
+        self.winner = None
+        self.optimal = False
+        self.obj_bound = None
+        self.runs = None
+
+    def solve(self, solvers=('gurobi', 'scip', 'sa'), time_limit=60, seed=None, initial_tour=None, params=None,
+              grace=5.0, cache=None):
+        """在多个进程中同时运行多个求解器，共用一个墙钟时间预算
+
+        每个求解器都以time_limit为时间限制，params为{求解器名称: solve参数}。
+        一旦某个精确求解器证明最优即返回其结果；否则等待至time_limit + grace，
+        在所有已返回的结果中取最短回路。返回前终止仍在运行的进程。
+        cache为ResultCache时，任一求解器已缓存的最优结果直接返回而不启动进程，各求解器也会读写该缓存。
+        """
+        start_time = time.time()
+        params = params or {}
+        for name in solvers:
+            get_solver(name)
+        if len(set(solvers)) != len(solvers):
+            raise ValueError("求解器名称不能重复")
+
+        if cache is not None:
+            for name in solvers:
+                entry = cached_optimum(cache, name, self.dist_matrix, self.coordinates, seed, **params.get(name, {}))
+                if entry is not None:
+                    self.runs = {name: entry}
+                    return self._finish(start_time)
+
+        dist_matrix = self.dist_matrix
+        ctx = multiprocessing.get_context()
+        results_queue = ctx.Queue()
+
+        shm = None
+        if isinstance(dist_matrix, np.ndarray):
+            shm = shared_memory.SharedMemory(create=True, size=max(dist_matrix.nbytes, 1))
+            np.ndarray(dist_matrix.shape, dtype=dist_matrix.dtype, buffer=shm.buf)[:] = dist_matrix
+            shared = (shm.name, dist_matrix.shape, dist_matrix.dtype, None)
+        else:
+            shared = (None, None, None, dist_matrix)
+
+        processes = {}
+        runs = {}
+        try:
+            for name in solvers:
+                process = ctx.Process(target=_portfolio_worker,
+                                      args=(name, *shared, self.coordinates, time_limit, seed, initial_tour,
+                                            dict(params.get(name, {})), cache, results_queue),
+                                      daemon=True)
+                process.start()
+                processes[name] = process
+
+            deadline = start_time + time_limit + grace
+            while len(runs) < len(processes):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    results = results_queue.get(timeout=min(remaining, 0.5))
+                except queue.Empty:
+                    # 进程异常退出而未返回结果时不再等待
+                    if all(not processes[name].is_alive() for name in processes if name not in runs):
+                        break
+                    continue
+                runs[results['solver']] = results
+                if results.get('optimal'):
+                    break
+        finally:
+            for process in processes.values():
+                if process.is_alive():
+                    process.terminate()
+            for process in processes.values():
+                process.join()
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+        for name in solvers:
+            if name not in runs:
+                runs[name] = {'solver': name, 'success': False, 'terminated': True}
+        self.runs = runs
+        return self._finish(start_time)
+
+    def _finish(self, start_time):
+        """从各求解器结果中选出最终解：优先取已证明最优的结果，否则取最短回路"""
+        end_time = time.time()
+        self.solve_time = end_time - start_time
+
+        candidates = [r for r in self.runs.values() if r['success'] and r.get('tour') is not None]
+        if not candidates:
+            return False
+        optimal = [r for r in candidates if r.get('optimal')]
+        best = optimal[0] if optimal else min(candidates, key=lambda r: r['distance'])
+        self.tour = best['tour']
+        self.distance = float(best['distance'])
+        self.winner = best['solver']
+        self.optimal = bool(best.get('optimal'))
+        bounds = [r['obj_bound'] for r in candidates if r.get('obj_bound') is not None]
+        self.obj_bound = max(bounds) if bounds else None
+
+        return True
+
+    def get_results(self):
+        """获取求解结果，runs为各求解器的结果（被终止的求解器标记terminated）"""
+        return {
+            'tour': self.tour,
+            'distance': self.distance,
+            'solve_time': self.solve_time,
+            'winner': self.winner,
+            'optimal': self.optimal,
+            'obj_bound': self.obj_bound,
+            'runs': self.runs
+        }
+
+    def print_results(self):
+        """打印求解结果"""
+        if self.tour is not None:
+            print("组合求解结果:")
+            print(f"最优路径: {[city + 1 for city in self.tour]}")
+            print(f"路径长度: {self.distance}")
+            print(f"求解时间: {self.solve_time:.2f}秒")
+            print(f"最好解来自: {self.winner}{'（已证明最优）' if self.optimal else ''}")
+            for name, run in self.runs.items():
+                status = '已终止' if run.get('terminated') else run.get('error', f"距离 {run.get('distance')}")
+                print(f"  {name}: {status}")
+        else:
+            print("组合求解未能找到可行解")
@@ -0,0 +1,70 @@
+import time
+
+
+class ProgressTrace:
+    """求解过程记录：按时间记录当前最好解、界、节点数/迭代次数、温度和接受率
+
+    min_interval为两条记录之间的最小时间间隔（秒），最好解改进时总会记录，
+    以便在频繁触发的回调中保持较低开销。
+    on_improve(elapsed, incumbent)在最好解改进时调用，可用于向外推送当前最好解；
+    stop_event为带is_set()方法的对象（如threading.Event、multiprocessing.Event），
+    求解器在记录进度的位置检查stopped()，置位后尽快结束并返回当前最好解。
+    """
+
+    FIELDS = ('time', 'incumbent', 'bound', 'nodes', 'temperature', 'acceptance_rate')
+
+    def __init__(self, min_interval=0.1, on_improve=None, stop_event=None):
+        self.min_interval = min_interval
+        self.on_improve = on_improve
+        self.stop_event = stop_event
+        self.start_time = time.time()
+        self.records = []
+        self.best = None
+
+    def start(self):
+        """重新开始计时并清空记录"""
+        self.start_time = time.time()
+        self.records = []
+        self.best = None
+
+    def stopped(self):
+        """是否已请求停止求解"""
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def record(self, incumbent=None, bound=None, nodes=None, temperature=None, acceptance_rate=None, force=False):
+        """添加一条记录，未改进且距上一条记录不足min_interval时忽略"""
+        elapsed = time.time() - self.start_time
+        if incumbent is not None and (self.best is None or incumbent < self.best):
+            self.best = incumbent
+            if self.on_improve is not None:
+                self.on_improve(elapsed, incumbent)
+        if self.records and not force:
+            last = self.records[-1]
+            improved = incumbent is not None and (last[1] is None or incumbent < last[1])
+            if not improved and elapsed - last[0] < self.min_interval:
+                return
+        self.records.append((elapsed, incumbent, bound, nodes, temperature, acceptance_rate))
+
+    def to_list(self):
+        """以字典列表形式返回全部记录"""
+        return [dict(zip(self.FIELDS, r)) for r in self.records]
+
+    def time_to_target(self, target):
+        """最好解首次不超过target的时间，未达到时返回None"""
+        for elapsed, incumbent, *_ in self.records:
+            if incumbent is not None and incumbent <= target:
+                return elapsed
+        return None
+
+    def __len__(self):
+        return len(self.records)
+
+
+def make_trace(trace):
+    """把solve()的trace参数转换为ProgressTrace对象：True创建默认记录器，False/None不记录"""
+    if trace is True:
+        return ProgressTrace()
+    if trace is False or trace is None:
+        return None
+    trace.start()
+    return trace
@@ -0,0 +1,76 @@
+import numpy as np
+
+from tour import swap, exchange_segments
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def _swap_delta(dist_matrix, tour, i, j):
+    """交换位置i和j(i < j)上城市后的路径长度变化量"""
+    n = tour.shape[0]
+    ci, cj = tour[i], tour[j]
+    i_prev, i_next = tour[(i - 1) % n], tour[(i + 1) % n]
+    j_prev, j_next = tour[(j - 1) % n], tour[(j + 1) % n]
+    if j == i + 1:
+        # 相邻位置
+        return (dist_matrix[i_prev, cj] + dist_matrix[ci, j_next]
+                - dist_matrix[i_prev, ci] - dist_matrix[cj, j_next])
+    if i == 0 and j == n - 1:
+        # 首尾相接
+        return (dist_matrix[j_prev, ci] + dist_matrix[cj, i_next]
+                - dist_matrix[j_prev, cj] - dist_matrix[ci, i_next])
+    return (dist_matrix[i_prev, cj] + dist_matrix[cj, i_next]
+            + dist_matrix[j_prev, ci] + dist_matrix[ci, j_next]
+            - dist_matrix[i_prev, ci] - dist_matrix[ci, i_next]
+            - dist_matrix[j_prev, cj] - dist_matrix[cj, j_next])
+
+
+def _segment_delta(dist_matrix, tour, i, j, k):
+    """交换相邻片段tour[i+1:j]与tour[j:k+1](i < j < k)后的路径长度变化量"""
+    if j == i + 1:
+        return 0.0
+    n = tour.shape[0]
+    a, a_next = tour[i], tour[i + 1]
+    b_prev, b = tour[j - 1], tour[j]
+    c, c_next = tour[k], tour[(k + 1) % n]
+    return (dist_matrix[a, b] + dist_matrix[c, a_next] + dist_matrix[b_prev, c_next]
+            - dist_matrix[a, a_next] - dist_matrix[b_prev, b] - dist_matrix[c, c_next])
+
+
+def _markov_chain(dist_matrix, tour, pos, e_current, best_tour, e_best, t, is_swap, indices, accept_draws):
+    """在温度t下按预生成的随机数运行一条完整的Markov链
+
+    原地更新tour及其位置索引pos和best_tour，同时返回接受次数。
+    """
+    n_accepted = 0
+    for m in range(is_swap.shape[0]):
+        i, j, k = indices[m, 0], indices[m, 1], indices[m, 2]
+        if is_swap[m]:
+            delta = _swap_delta(dist_matrix, tour, i, j)
+        else:
+            delta = _segment_delta(dist_matrix, tour, i, j, k)
+
+        # 接受准则
+        if delta < 0 or accept_draws[m] < np.exp(-delta / t):
+            if is_swap[m]:
+                swap(tour, pos, i, j)
+            else:
+                exchange_segments(tour, pos, i, j, k)
+            e_current += delta
+            n_accepted += 1
+            if e_current < e_best:
+                e_best = e_current
+                best_tour[:] = tour
+    return tour, e_current, best_tour, e_best, n_accepted
+
+
+if HAS_NUMBA:
+    _swap_delta = njit(cache=True)(_swap_delta)
+    _segment_delta = njit(cache=True)(_segment_delta)
+    markov_chain = njit(cache=True)(_markov_chain)
+else:
+    markov_chain = None
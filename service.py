@@ -0,0 +1,339 @@
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import queue
+import time
+
+import numpy as np
+
+from data import TSPData
+from progress import ProgressTrace
+from solvers import available_solvers, get_solver, run_solver
+
+# 超过该城市数时工作进程使用惰性距离矩阵
+DENSE_LIMIT = 5000
+
+# 作业的终止状态
+FINAL_STATES = ('done', 'failed', 'cancelled', 'expired')
+
+
+def _summary(results):
+    """把run_solver的结果整理为可JSON序列化的字典"""
+    tour = results.get('tour')
+    return {
+        'solver': results['solver'],
+        'success': results['success'],
+        'tour': None if tour is None else [int(city) for city in tour],
+        'distance': None if results.get('distance') is None else float(results['distance']),
+        'solve_time': results.get('solve_time'),
+        'optimal': bool(results.get('optimal')),
+        'obj_bound': None if results.get('obj_bound') is None else float(results['obj_bound']),
+    }
+
+
+def _service_worker(coordinates, solver, time_limit, seed, params, stop_event, events):
+    """在独立进程中运行一个作业：最好解改进时推送incumbent事件，结束时推送result或error事件"""
+    try:
+        data = TSPData().load_custom_data(coordinates, lazy=len(coordinates) > DENSE_LIMIT)
+        trace = ProgressTrace(stop_event=stop_event, on_improve=lambda elapsed, incumbent: events.put(
+            {'type': 'incumbent', 'elapsed': elapsed, 'distance': float(incumbent)}))
+        results = run_solver(solver, data.dist_matrix, data.coordinates, time_limit=time_limit, seed=seed,
+                             trace=trace, **params)
+        events.put({'type': 'result', 'results': _summary(results)})
+    except Exception as e:
+        events.put({'type': 'error', 'error': repr(e)})
+
+
+class TspJob:
+    """一个求解作业：参数、状态和按时间顺序的事件记录"""
+
+    def __init__(self, job_id, coordinates, solver, time_limit, deadline, seed, params):
+        self.id = job_id
+        self.coordinates = coordinates
+        self.solver = solver
+        self.time_limit = time_limit
+        self.deadline = deadline
+        self.seed = seed
+        self.params = params
+        self.state = 'queued'
+        self.submitted = time.time()
+        self.events = []
+        self.best = None
+        self.result = None
+        self.cancel_requested = False
+        self.stop_event = None
+        self.kill_at = None
+        self.task = None
+        self.condition = asyncio.Condition()
+
+    def status(self):
+        """作业状态摘要"""
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'solver': self.solver,
+            'n': int(self.coordinates.shape[0]),
+            'best': self.best,
+            'elapsed': time.time() - self.submitted,
+            'result': self.result,
+        }
+
+
+class TspService:
+    """异步求解服务：作业在至多max_workers个子进程中运行，超出的作业排队等待
+
+    求解过程中最好解的每次改进都作为incumbent事件推送给stream()的订阅者。
+    取消或到达时限时先通过停止标志通知求解器（Gurobi调用model.terminate()，SCIP中断求解，
+    模拟退火和Lin-Kernighan结束循环），求解器返回当前最好解；grace秒后仍未结束则强制终止进程。
+    """
+
+    def __init__(self, max_workers=2, grace=5.0, poll_interval=0.1):
+        self.max_workers = max_workers
+        self.grace = grace
+        self.poll_interval = poll_interval
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._slots = None
+        self._ctx = multiprocessing.get_context()
+
+    def _job(self, job_id):
+        """按编号查找作业，不存在时抛出KeyError"""
+        if job_id not in self.jobs:
+            raise KeyError(f"未知的作业: {job_id}")
+        return self.jobs[job_id]
+
+    async def submit(self, coordinates, solver='lk', time_limit=60, deadline=None, seed=None, params=None):
+        """提交作业，返回作业编号
+
+        time_limit为求解器的时间限制（秒）；deadline为从提交起算的总时限（秒，含排队时间），
+        排队超过deadline的作业不再运行，开始运行的作业的时间限制不超过剩余时间。
+        """
+        get_solver(solver)
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        if coordinates.ndim != 2 or coordinates.shape[1] < 2 or coordinates.shape[0] < 3:
+            raise ValueError("coordinates必须是至少3个城市的(n, 2)坐标数组")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        job = TspJob(str(next(self._ids)), coordinates[:, :2], solver, time_limit, deadline, seed, params or {})
+        self.jobs[job.id] = job
+        await self._emit(job, {'type': 'queued'})
+        job.task = asyncio.create_task(self._run(job))
+        return job.id
+
+    async def _emit(self, job, event):
+        """记录事件并唤醒等待该作业事件的订阅者"""
+        event = dict(event, job_id=job.id, time=time.time() - job.submitted)
+        async with job.condition:
+            job.events.append(event)
+            job.condition.notify_all()
+
+    async def _finish(self, job, state, result=None, error=None):
+        """设置终止状态并推送最后一个事件"""
+        job.state = state
+        job.result = result
+        await self._emit(job, {'type': state, 'result': result, 'error': error})
+
+    async def _run(self, job):
+        """排队等待空闲进程后运行作业，转发进度事件，处理取消和时限"""
+        try:
+            await self._slots.acquire()
+        except asyncio.CancelledError:
+            # 排队中的作业由cancel()负责结束
+            return
+        try:
+            time_limit = job.time_limit
+            if job.deadline is not None:
+                remaining = job.deadline - (time.time() - job.submitted)
+                if remaining <= 0:
+                    await self._finish(job, 'expired')
+                    return
+                time_limit = remaining if time_limit is None else min(time_limit, remaining)
+            await self._execute(job, time_limit)
+        finally:
+            self._slots.release()
+
+    async def _execute(self, job, time_limit):
+        """在子进程中求解，时限到达后再等待grace秒才发出停止请求"""
+        loop = asyncio.get_running_loop()
+        job.stop_event = self._ctx.Event()
+        events = self._ctx.Queue()
+        process = self._ctx.Process(target=_service_worker,
+                                    args=(job.coordinates, job.solver, time_limit, job.seed, job.params,
+                                          job.stop_event, events),
+                                    daemon=True)
+        process.start()
+        job.state = 'running'
+        await self._emit(job, {'type': 'started', 'time_limit': time_limit})
+
+        stop_at = None if time_limit is None else time.time() + time_limit + self.grace
+        result, error = None, None
+        try:
+            while True:
+                now = time.time()
+                if stop_at is not None and now >= stop_at and not job.stop_event.is_set():
+                    job.stop_event.set()
+                    job.kill_at = now + self.grace
+                if job.kill_at is not None and now >= job.kill_at:
+                    error = "求解器未在规定时间内响应停止请求，已强制终止"
+                    break
+                try:
+                    event = await loop.run_in_executor(None, events.get, True, self.poll_interval)
+                except queue.Empty:
+                    if not process.is_alive() and events.empty():
+                        error = f"工作进程异常退出（退出码{process.exitcode}）"
+                        break
+                    continue
+                if event['type'] == 'incumbent':
+                    job.best = event['distance']
+                    await self._emit(job, event)
+                elif event['type'] == 'result':
+                    result = event['results']
+                    break
+                else:
+                    error = event['error']
+                    break
+        finally:
+            if process.is_alive():
+                process.terminate()
+            await loop.run_in_executor(None, process.join)
+
+        if job.cancel_requested:
+            await self._finish(job, 'cancelled', result, error)
+        elif result is not None and result['success']:
+            await self._finish(job, 'done', result)
+        else:
+            await self._finish(job, 'failed', result, error or "求解器未找到可行解")
+
+    def cancel(self, job_id):
+        """取消作业：排队中的作业直接取消，运行中的作业请求求解器停止并返回当前最好解，返回是否有效"""
+        job = self._job(job_id)
+        if job.state in FINAL_STATES:
+            return False
+        job.cancel_requested = True
+        if job.state == 'queued':
+            # 任务可能尚未开始运行，取消后不会执行_run中的任何代码，因此在这里结束作业
+            job.state = 'cancelled'
+            job.task.cancel()
+            job.task = asyncio.ensure_future(self._finish(job, 'cancelled'))
+        elif job.stop_event is not None and not job.stop_event.is_set():
+            job.stop_event.set()
+            job.kill_at = time.time() + self.grace
+        return True
+
+    async def stream(self, job_id):
+        """按顺序产生作业的全部事件（包括订阅之前的事件），作业结束后停止"""
+        job = self._job(job_id)
+        index = 0
+        while True:
+            async with job.condition:
+                await job.condition.wait_for(lambda: len(job.events) > index)
+                new_events = job.events[index:]
+            for event in new_events:
+                index += 1
+                yield event
+                if event['type'] in FINAL_STATES:
+                    return
+
+    async def result(self, job_id):
+        """等待作业结束并返回状态摘要"""
+        job = self._job(job_id)
+        await job.task
+        return job.status()
+
+    async def close(self):
+        """取消全部未结束的作业并等待其结束"""
+        for job in self.jobs.values():
+            if job.state not in FINAL_STATES:
+                self.cancel(job.id)
+        await asyncio.gather(*(job.task for job in self.jobs.values()), return_exceptions=True)
+
+    async def handle_http(self, reader, writer):
+        """本地测试用的最小HTTP接口，请求和响应均为JSON：
+
+        POST /jobs 提交作业（coordinates、solver、time_limit、deadline、seed、params），
+        GET /jobs 列出作业，GET /jobs/<id> 查询状态，GET /jobs/<id>/events 以每行一个JSON的形式推送事件，
+        DELETE /jobs/<id> 取消作业。
+        """
+        try:
+            method, path, _ = (await reader.readline()).decode('latin-1').split()
+            length = 0
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            body = json.loads(await reader.readexactly(length)) if length else {}
+            parts = [p for p in path.split('/') if p]
+
+            if method == 'POST' and parts == ['jobs']:
+                if 'coordinates' not in body:
+                    raise ValueError("请求中缺少coordinates")
+                job_id = await self.submit(body['coordinates'], body.get('solver', 'lk'),
+                                           body.get('time_limit', 60), body.get('deadline'), body.get('seed'),
+                                           body.get('params'))
+                await _respond(writer, 201, {'job_id': job_id})
+            elif method == 'GET' and parts == ['jobs']:
+                await _respond(writer, 200, [job.status() for job in self.jobs.values()])
+            elif method == 'GET' and len(parts) == 2 and parts[0] == 'jobs':
+                await _respond(writer, 200, self._job(parts[1]).status())
+            elif method == 'GET' and len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+                # 先查找作业，未知作业在写出响应头之前返回404
+                self._job(parts[1])
+                events = self.stream(parts[1])
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n")
+                async for event in events:
+                    writer.write((json.dumps(event) + "\n").encode())
+                    await writer.drain()
+            elif method == 'DELETE' and len(parts) == 2 and parts[0] == 'jobs':
+                await _respond(writer, 202, {'job_id': parts[1], 'cancelled': self.cancel(parts[1])})
+            else:
+                await _respond(writer, 404, {'error': f"未知的请求: {method} {path}"})
+        except KeyError as e:
+            await _respond(writer, 404, {'error': e.args[0]})
+        except (ValueError, TypeError) as e:
+            await _respond(writer, 400, {'error': str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+_REASONS = {200: 'OK', 201: 'Created', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found'}
+
+
+async def _respond(writer, code, payload):
+    """写出一个JSON响应"""
+    body = json.dumps(payload).encode()
+    writer.write(f"HTTP/1.1 {code} {_REASONS[code]}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+
+
+async def serve(host='127.0.0.1', port=8080, max_workers=2, grace=5.0):
+    """启动HTTP服务直到进程被终止"""
+    service = TspService(max_workers=max_workers, grace=grace)
+    server = await asyncio.start_server(service.handle_http, host, port)
+    print(f"TSP求解服务已启动: http://{host}:{port}，可用求解器: {', '.join(available_solvers())}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TSP异步求解服务（本地HTTP接口）")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=2, help="同时运行的求解进程数")
+    parser.add_argument('--grace', type=float, default=5.0, help="停止请求后等待求解器返回的秒数")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.workers, args.grace))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import importlib.util
+import time
+
+from cache import instance_fingerprint
+
+# 求解器注册表：名称 -> 运行函数
+SOLVERS = {}
+
+# 超过该城市数时精确求解器难以在实用时间内证明最优，默认改用Lin-Kernighan
+EXACT_SIZE_LIMIT = 1000
+
+# 精确求解器依赖的可选模块
+_EXACT_MODULES = {'gurobi': 'gurobipy', 'scip': 'pyscipopt'}
+
+
+def register_solver(name, exact=False, warm_start=False):
+    """注册求解器的装饰器
+
+    被注册的运行函数签名统一为(dist_matrix, coordinates, time_limit=None, seed=None, initial_tour=None, **params)，
+    返回(success, results)。exact表示能否证明最优性，warm_start表示能否利用initial_tour；
+    不支持的参数（如精确求解器的seed）由运行函数忽略。
+    """
+    def decorator(func):
+        func.exact = exact
+        func.warm_start = warm_start
+        SOLVERS[name] = func
+        return func
+    return decorator
+
+
+def available_solvers():
+    """已注册的求解器名称"""
+    return sorted(SOLVERS)
+
+
+def get_solver(name):
+    """按名称获取求解器运行函数"""
+    if name not in SOLVERS:
+        raise ValueError(f"未知的求解器: {name}，可选: {', '.join(available_solvers())}")
+    return SOLVERS[name]
+
+
+def default_solver(n, exact_limit=EXACT_SIZE_LIMIT):
+    """按城市数选择默认求解器：中小规模用精确求解器Gurobi（未安装时用SCIP），大规模用Lin-Kernighan"""
+    if n <= exact_limit:
+        for name in ('gurobi', 'scip'):
+            if _module_available(_EXACT_MODULES[name]):
+                return name
+    return 'lk'
+
+
+def _module_available(module):
+    """可选依赖是否已安装"""
+    return importlib.util.find_spec(module) is not None
+
+
+def run_solver(name, dist_matrix, coordinates, time_limit=None, seed=None, initial_tour=None, cache=None,
+               **params):
+    """按名称运行求解器，返回统一格式的结果字典
+
+    在各求解器get_results()的基础上补充solver、success、obj_bound和optimal字段，
+    只有精确求解器在证明最优（达到MIP间隙）时optimal为True。
+    cache为ResultCache时先查缓存：已证明最优的结果直接返回（cached为True），
+    未证明最优的结果在未指定initial_tour时作为初始解；求解后把更好的结果写回缓存。
+    initial_tour也可以是construction.construct_tour的构造方法名称，如'greedy'、'hilbert'。
+    """
+    start_time = time.time()
+    solver = get_solver(name)
+    key = None
+    if cache is not None:
+        key = _cache_key(cache, name, dist_matrix, coordinates, seed, params)
+        entry = cache.get(key)
+        if entry is not None and entry['optimal']:
+            return _cached_results(entry)
+        if entry is not None and initial_tour is None and solver.warm_start:
+            initial_tour = entry['tour']
+    if isinstance(initial_tour, str):
+        from construction import construct_tour
+        initial_tour = construct_tour(initial_tour, coordinates, seed=seed)
+
+    success, results = solver(dist_matrix, coordinates, time_limit, seed, initial_tour, **params)
+    results = dict(results)
+    results['solver'] = name
+    results['success'] = bool(success)
+    results.setdefault('obj_bound', None)
+    results.setdefault('optimal', False)
+    if results.get('solve_time') is None:
+        results['solve_time'] = time.time() - start_time
+    results['cached'] = False
+    if cache is not None and results['success'] and results.get('tour') is not None:
+        cache.put(key, results)
+    return results
+
+
+def _cache_key(cache, name, dist_matrix, coordinates, seed, params):
+    """缓存键，精确求解器的结果与随机种子无关"""
+    if not get_solver(name).exact:
+        params = dict(params, seed=seed)
+    return cache.key(instance_fingerprint(dist_matrix, coordinates), name, params)
+
+
+def _cached_results(entry):
+    """把缓存条目转换为run_solver的结果格式"""
+    entry['success'] = True
+    entry['cached'] = True
+    return entry
+
+
+def cached_optimum(cache, name, dist_matrix, coordinates, seed=None, **params):
+    """缓存中该求解器在相同参数下已证明最优的结果，没有时返回None"""
+    entry = cache.get(_cache_key(cache, name, dist_matrix, coordinates, seed, params))
+    if entry is None or not entry['optimal']:
+        return None
+    return _cached_results(entry)
+
+
+def _exact_kwargs(time_limit, initial_tour, params):
+    """精确求解器的公共参数，未指定时使用求解器默认值"""
+    kwargs = dict(params)
+    if time_limit is not None:
+        kwargs['time_limit'] = time_limit
+    if initial_tour is not None:
+        kwargs['initial_tour'] = initial_tour
+    return kwargs
+
+
+@register_solver('gurobi', exact=True, warm_start=True)
+def _run_gurobi(dist_matrix, coordinates, time_limit=None, seed=None, initial_tour=None, **params):
+    """Gurobi精确求解"""
+    from Tsp_Gurobi import TspGurobi
+    solver = TspGurobi(dist_matrix, dist_matrix.shape[0])
+    success = solver.solve(**_exact_kwargs(time_limit, initial_tour, params))
+    return success, solver.get_results()
+
+
+@register_solver('scip', exact=True, warm_start=True)
+def _run_scip(dist_matrix, coordinates, time_limit=None, seed=None, initial_tour=None, **params):
+    """SCIP精确求解"""
+    from Tsp_SCIP import TspScip
+    solver = TspScip(dist_matrix, dist_matrix.shape[0])
+    success = solver.solve(**_exact_kwargs(time_limit, initial_tour, params))
+    return success, solver.get_results()
+
+
+@register_solver('sa', warm_start=True)
+def _run_sa(dist_matrix, coordinates, time_limit=None, seed=None, initial_tour=None, **params):
+    """模拟退火，指定time_limit时默认使用自动温度和时间预算降温"""
+    from Tsp_SA import TspSA
+    solver = TspSA(dist_matrix, coordinates)
+    if time_limit is not None:
+        params.setdefault('t0', "auto")
+        params.setdefault('tf', "auto")
+        params.setdefault('min_acceptance', 0.01)
+    success = solver.solve(seed=seed, time_limit=time_limit, initial_tour=initial_tour, **params)
+    return success, solver.get_results()
+
+
+@register_solver('local_search', warm_start=True)
+def _run_local_search(dist_matrix, coordinates, time_limit=None, seed=None, initial_tour=None, **params):
+    """2-opt/Or-opt局部搜索，从initial_tour（默认随机回路）出发直到局部最优"""
+    from local_search import LocalSearch
+    solver = LocalSearch(dist_matrix, coordinates, k=params.pop('k', 10))
+    success = solver.solve(initial_tour=initial_tour, seed=seed, **params)
+    return success, solver.get_results()
+
+
+@register_solver('lk', warm_start=True)
+def _run_lk(dist_matrix, coordinates, time_limit=None, seed=None, initial_tour=None, **params):
+    """迭代Lin-Kernighan，从initial_tour（默认为近邻边上的贪心回路）出发，指定time_limit时在时限内持续扰动"""
+    from lin_kernighan import LinKernighan
+    solver = LinKernighan(dist_matrix, coordinates, k=params.pop('k', 10))
+    success = solver.solve(initial_tour=initial_tour, time_limit=time_limit, seed=seed, **params)
+    return success, solver.get_results()
@@ -0,0 +1,125 @@
+import numpy as np
+
+
+def connected_components(n, edges):
+    """求由边集构成的无向图的连通分量，返回城市列表的列表"""
+    adjacency = [[] for _ in range(n)]
+    for i, j in edges:
+        adjacency[i].append(j)
+        adjacency[j].append(i)
+
+    components = []
+    visited = [False] * n
+    for start in range(n):
+        if visited[start]:
+            continue
+        visited[start] = True
+        component = [start]
+        stack = [start]
+        while stack:
+            city = stack.pop()
+            for neighbor in adjacency[city]:
+                if not visited[neighbor]:
+                    visited[neighbor] = True
+                    component.append(neighbor)
+                    stack.append(neighbor)
+        components.append(component)
+    return components
+
+
+def tour_from_edges(n, edges):
+    """由构成哈密顿回路的无向边集从城市0开始还原访问顺序"""
+    adjacency = [[] for _ in range(n)]
+    for i, j in edges:
+        adjacency[i].append(j)
+        adjacency[j].append(i)
+
+    tour = [0]
+    previous, current = None, 0
+    while len(tour) < n:
+        next_city = adjacency[current][0] if adjacency[current][0] != previous else adjacency[current][1]
+        tour.append(next_city)
+        previous, current = current, next_city
+    return tour
+
+
+def tour_arcs(tour):
+    """返回回路从城市0出发依次经过的有向弧以及每个城市的访问次序"""
+    tour = [int(city) for city in tour]
+    start = tour.index(0)
+    tour = tour[start:] + tour[:start]
+    n = len(tour)
+    arcs = [(tour[k], tour[(k + 1) % n]) for k in range(n)]
+    order = {city: k for k, city in enumerate(tour)}
+    return arcs, order
+
+
+def greedy_edge_tour(n, edges, weights, dist_matrix):
+    """贪心选边构造回路：按权重降序、长度升序选取不使度超过2且不成环的边，剩余路径片段按端点最近邻连接
+
+    权重可以取LP解的值；权重全为0时即按长度的经典贪心边算法。
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    weights = np.asarray(weights, dtype=np.float64)
+    lengths = np.asarray(dist_matrix[edges[:, 0], edges[:, 1]], dtype=np.float64)
+    order = np.lexsort((lengths, -weights))
+
+    degree = [0] * n
+    parent = list(range(n))
+    adjacency = [[] for _ in range(n)]
+
+    def find(city):
+        while parent[city] != city:
+            parent[city] = parent[parent[city]]
+            city = parent[city]
+        return city
+
+    for k in order:
+        i, j = int(edges[k, 0]), int(edges[k, 1])
+        if degree[i] >= 2 or degree[j] >= 2:
+            continue
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j:
+            continue
+        parent[root_i] = root_j
+        degree[i] += 1
+        degree[j] += 1
+        adjacency[i].append(j)
+        adjacency[j].append(i)
+
+    # 从度小于2的端点出发遍历出各路径片段
+    fragments = []
+    visited = [False] * n
+    for start in range(n):
+        if visited[start] or degree[start] == 2:
+            continue
+        fragment = [start]
+        visited[start] = True
+        previous, current = None, start
+        while True:
+            following = [city for city in adjacency[current] if city != previous]
+            if not following:
+                break
+            previous, current = current, following[0]
+            fragment.append(current)
+            visited[current] = True
+        fragments.append(fragment)
+
+    # 片段按端点最近邻连接：每次从当前末端走到最近的未使用片段的某个端点
+    heads = np.array([fragment[0] for fragment in fragments])
+    tails = np.array([fragment[-1] for fragment in fragments])
+    used = np.zeros(len(fragments), dtype=bool)
+    used[0] = True
+    tour = list(fragments[0])
+    for _ in range(len(fragments) - 1):
+        row = np.asarray(dist_matrix[tour[-1]], dtype=np.float64)
+        to_head = np.where(used, np.inf, row[heads])
+        to_tail = np.where(used, np.inf, row[tails])
+        if to_head.min() <= to_tail.min():
+            k = int(np.argmin(to_head))
+            tour.extend(fragments[k])
+        else:
+            k = int(np.argmin(to_tail))
+            tour.extend(reversed(fragments[k]))
+        used[k] = True
+    return tour
@@ -0,0 +1,16 @@
+import numpy as np
+
+from decomposition import TspDecomposition
+
+
+def test_geo_repair_uses_instance_metric():
+    """边界修复按实例的距离类型优化，修复后不比只拼接的回路差"""
+    rng = np.random.default_rng(0)
+    coordinates = np.column_stack([rng.uniform(30, 50, 800), rng.uniform(-10, 30, 800)]).round(2)
+    lengths = []
+    for repair in (False, True):
+        solver = TspDecomposition(coordinates, edge_weight_type='GEO')
+        solver.solve(cluster_size=200, workers=1, seed=0, repair=repair, params={'max_trials': 100})
+        assert sorted(solver.tour) == list(range(800))
+        lengths.append(solver.distance)
+    assert lengths[1] <= lengths[0]
@@ -0,0 +1,100 @@
+import tracemalloc
+
+import numpy as np
+
+from data import TSPData
+from incremental import TspIncremental
+
+
+def _data(n, seed=0):
+    data = TSPData()
+    data.load_custom_data(np.random.default_rng(seed).random((n, 2)) * 1000)
+    return data
+
+
+def _assert_matches_recomputation(data):
+    expected = data.compute_distance_matrix(data.coordinates, edge_weight_type=data.edge_weight_type)
+    assert data.dist_matrix.shape == (data.n, data.n)
+    assert np.array_equal(data.dist_matrix, expected)
+
+
+def test_updates_match_recomputation():
+    """增删改城市后的距离矩阵与按新坐标重新计算的结果一致"""
+    data = _data(200)
+    rng = np.random.default_rng(1)
+    data.add_cities(rng.random((30, 2)) * 1000)
+    _assert_matches_recomputation(data)
+    mapping = data.remove_cities([0, 5, 100, 229])
+    assert (mapping == -1).sum() == 4
+    assert sorted(mapping[mapping >= 0]) == list(range(226))
+    _assert_matches_recomputation(data)
+    data.move_cities([1, 2, 3], rng.random((3, 2)) * 1000)
+    _assert_matches_recomputation(data)
+    data.add_cities(rng.random((2, 2)) * 1000)
+    _assert_matches_recomputation(data)
+
+
+def test_remove_and_move_work_in_place():
+    """删除和移动城市只改动受影响的行和列，不分配与矩阵同量级的内存"""
+    data = _data(1000)
+    matrix = data.dist_matrix
+    tracemalloc.start()
+    data.move_cities([3, 7], [[1.0, 2.0], [3.0, 4.0]])
+    data.remove_cities([0, 10, 500])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < matrix.nbytes / 20
+    assert np.shares_memory(data.dist_matrix, matrix)
+    _assert_matches_recomputation(data)
+    # 删除后腾出的容量供之后增加城市时复用
+    data.add_cities([[5.0, 5.0]])
+    assert np.shares_memory(data.dist_matrix, matrix)
+    _assert_matches_recomputation(data)
+
+
+def test_incremental_tour_stays_valid():
+    """增量修改后回路仍是全部城市的排列，长度与距离矩阵一致"""
+    data = _data(300, seed=2)
+    tour = np.arange(300)
+    solver = TspIncremental(data, tour, repair='lk')
+    rng = np.random.default_rng(3)
+    solver.add_cities(rng.random((5, 2)) * 1000)
+    solver.remove_cities([1, 2, 3])
+    solver.move_cities([10, 20], rng.random((2, 2)) * 1000)
+    results = solver.get_results()
+    assert sorted(results['tour']) == list(range(data.n))
+    length = data.dist_matrix[results['tour'], np.roll(results['tour'], -1)].sum()
+    assert abs(results['distance'] - length) < 1e-6
+    assert results['updates'] == 3
+
+
+def test_edits_do_not_touch_cache_files(tmp_path):
+    """从缓存加载的实例（首次为可写内存映射，之后为只读内存映射）修改后，缓存文件保持不变"""
+    coordinates = np.random.default_rng(4).random((50, 2)) * 1000
+    path = tmp_path / "points.csv"
+    np.savetxt(path, coordinates, delimiter=',')
+    cache_dir = tmp_path / "cache"
+    for _ in range(2):
+        data = TSPData().load_file(str(path), cache_dir=str(cache_dir))
+        snapshot = {f.name: f.read_bytes() for f in cache_dir.iterdir()}
+        data.move_cities([0], [[1.0, 2.0]])
+        data.remove_cities([5])
+        data.add_cities([[3.0, 4.0]])
+        _assert_matches_recomputation(data)
+        assert {f.name: f.read_bytes() for f in cache_dir.iterdir()} == snapshot
+    reloaded = TSPData().load_file(str(path), cache_dir=str(cache_dir))
+    assert np.array_equal(reloaded.dist_matrix, reloaded.compute_distance_matrix(np.asarray(reloaded.coordinates)))
+
+
+def test_reload_resets_instance_metadata(tmp_path):
+    """在加载过GEO实例的对象上重新加载默认数据或自定义坐标时按欧氏距离计算，名称不沿用"""
+    path = tmp_path / "geo.tsp"
+    path.write_text("NAME: geo3\nTYPE: TSP\nDIMENSION: 3\nEDGE_WEIGHT_TYPE: GEO\n"
+                    "NODE_COORD_SECTION\n1 10.0 20.0\n2 11.0 21.0\n3 12.0 19.0\nEOF\n")
+    for load in (lambda d: d.load_default_data(), lambda d: d.load_custom_data([[0.0, 0.0], [3.0, 4.0]])):
+        data = TSPData().load_file(str(path))
+        assert data.name == "geo3"
+        load(data)
+        assert data.name is None and data.edge_weight_type is None
+        _assert_matches_recomputation(data)
+        assert abs(data.dist_matrix[0, 1] - np.hypot(*np.subtract(data.coordinates[0], data.coordinates[1]))) < 1e-9
@@ -0,0 +1,77 @@
+import numpy as np
+
+from data import LazyDistanceMatrix, pairwise_distances
+from lin_kernighan import LinKernighan, _iterated_lk, _new_log, _tour_length
+from local_search import MATRIX_METRIC, nearest_neighbors
+from tour import build_positions
+
+
+def _random_instance(n, seed=0):
+    coordinates = np.random.default_rng(seed).random((n, 2)) * 1000
+    return coordinates, pairwise_distances(coordinates[:, None, :], coordinates[None, :, :])
+
+
+def _canonical(tour):
+    """回路的规范形式：从城市0出发，第二个城市编号小于最后一个"""
+    tour = np.roll(tour, -int(np.flatnonzero(tour == 0)[0]))
+    return tour if tour[1] < tour[-1] else np.roll(tour[::-1], 1)
+
+
+def test_rejected_kick_restores_tour():
+    """没有改进的扰动撤销后，回路、位置索引和长度与扰动前完全相同"""
+    n, max_depth = 200, 50
+    coordinates, dist_matrix = _random_instance(n)
+    neighbors = nearest_neighbors(coordinates, 10)
+    lk = LinKernighan(dist_matrix, coordinates)
+    tour = lk.improve(lk.greedy_tour())
+    pos = build_positions(tour)
+    length = _tour_length(tour, coordinates, dist_matrix, MATRIX_METRIC)
+    chain = np.zeros((max_depth, 4), dtype=np.int64)
+    log = _new_log(max_depth)
+    log_state = np.zeros(2, dtype=np.int64)
+    queue = np.empty(n, dtype=np.int64)
+    in_queue = np.zeros(n, dtype=np.bool_)
+    head_tail = np.zeros(2, dtype=np.int64)
+    rng = np.random.default_rng(1)
+
+    rejected = 0
+    for _ in range(500):
+        kick = np.array([[rng.integers(n), rng.integers(1, 50), rng.integers(1, 50)]], dtype=np.int64)
+        before = tour.copy()
+        new_length, improved = _iterated_lk(tour, pos, length, coordinates, dist_matrix, MATRIX_METRIC,
+                                            neighbors, max_depth, kick, chain, log, log_state, queue, in_queue,
+                                            head_tail, 1e-9)
+        assert np.array_equal(pos[tour], np.arange(n))
+        assert new_length <= length
+        assert abs(new_length - _tour_length(tour, coordinates, dist_matrix, MATRIX_METRIC)) < 1e-6
+        if not improved:
+            rejected += 1
+            assert new_length == length
+            assert np.array_equal(_canonical(tour), _canonical(before))
+        length = new_length
+    assert rejected > 0
+
+
+def test_solve_never_worse_than_start():
+    """迭代过程只接受改进，结果不差于初始局部最优"""
+    coordinates, dist_matrix = _random_instance(300, seed=2)
+    lk = LinKernighan(dist_matrix, coordinates)
+    start = lk.improve(lk.greedy_tour())
+    start_length = dist_matrix[start, np.roll(start, -1)].sum()
+    lk.solve(initial_tour=start, max_trials=300, batch_size=1, seed=0)
+    assert sorted(lk.tour) == list(range(300))
+    assert lk.distance <= start_length + 1e-6
+    assert abs(lk.distance - dist_matrix[lk.tour, np.roll(lk.tour, -1)].sum()) < 1e-6
+
+
+def test_lazy_matrix_uses_edge_weight_type():
+    """惰性距离矩阵按其距离类型计算，结果与稠密矩阵相同"""
+    coordinates = np.random.default_rng(3).random((300, 2)) * 5000
+    dense = pairwise_distances(coordinates[:, None, :], coordinates[None, :, :], 'ATT')
+    distances = []
+    for dist_matrix in (dense, LazyDistanceMatrix(coordinates, edge_weight_type='ATT')):
+        lk = LinKernighan(dist_matrix, coordinates)
+        lk.solve(max_trials=300, seed=0)
+        assert lk.distance == dense[lk.tour, np.roll(lk.tour, -1)].sum()
+        distances.append(lk.distance)
+    assert distances[0] == distances[1]
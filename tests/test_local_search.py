@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from data import LazyDistanceMatrix, pairwise_distances
+from local_search import LocalSearch, _dist, kernel_arrays
+
+
+def _coordinates(n, edge_weight_type, seed=0):
+    rng = np.random.default_rng(seed)
+    if edge_weight_type == 'GEO':
+        # TSPLIB GEO格式的“度.分”坐标
+        return np.column_stack([rng.uniform(-60, 60, n), rng.uniform(-170, 170, n)]).round(2)
+    return rng.random((n, 2)) * 5000
+
+
+@pytest.mark.parametrize('edge_weight_type', [None, 'EUC_2D', 'CEIL_2D', 'ATT', 'GEO'])
+def test_kernel_distance_matches_pairwise(edge_weight_type):
+    """没有稠密矩阵时内核按距离类型由坐标计算的距离与pairwise_distances一致"""
+    coordinates = _coordinates(60, edge_weight_type)
+    expected = pairwise_distances(coordinates[:, None, :], coordinates[None, :, :], edge_weight_type)
+    arrays = kernel_arrays(LazyDistanceMatrix(coordinates, edge_weight_type=edge_weight_type), coordinates)
+    actual = np.array([[_dist(*arrays, i, j) for j in range(60)] for i in range(60)])
+    assert np.allclose(actual, expected, rtol=0, atol=1e-9)
+
+
+def test_lazy_local_search_matches_dense():
+    """惰性距离矩阵与稠密矩阵上的局部搜索结果相同"""
+    coordinates = _coordinates(300, 'ATT', seed=1)
+    dense = pairwise_distances(coordinates[:, None, :], coordinates[None, :, :], 'ATT')
+    results = []
+    for dist_matrix in (dense, LazyDistanceMatrix(coordinates, edge_weight_type='ATT')):
+        solver = LocalSearch(dist_matrix, coordinates)
+        solver.solve(seed=0)
+        results.append(solver.get_results())
+    assert np.array_equal(results[0]['tour'], results[1]['tour'])
+    assert results[0]['distance'] == results[1]['distance']
@@ -0,0 +1,44 @@
+import numpy as np
+
+from data import pairwise_distances
+from Tsp_SA import TspSA, anneal, markov_chain, tour_length
+
+
+def _random_instance(n, seed=0):
+    coordinates = np.random.default_rng(seed).random((n, 2)) * 1000
+    return coordinates, pairwise_distances(coordinates[:, None, :], coordinates[None, :, :])
+
+
+def test_time_limited_schedule_reaches_tf():
+    """缩短Markov链后降温系数仍按剩余时间设定，时限结束时温度接近tf"""
+    coordinates, dist_matrix = _random_instance(300)
+    # 预先编译内核，避免编译时间计入时限
+    TspSA(dist_matrix, coordinates).solve(t0=1, tf=0.5, markov_length=10, seed=0)
+    for min_acceptance in (0.0, 0.01, 0.05):
+        solver = TspSA(dist_matrix, coordinates)
+        solver.solve(t0=500, tf=0.5, time_limit=1.0, min_acceptance=min_acceptance, seed=0, trace=True)
+        last = solver.get_results()['trace'].to_list()[-1]
+        assert last['temperature'] < 2 * 0.5
+        assert solver.solve_time < 1.5
+
+
+def test_stagnation_waits_for_low_temperature():
+    """从好的初始回路出发时高温阶段最优解不改进，停滞判断不应在降温前结束退火"""
+    coordinates, dist_matrix = _random_instance(100, seed=1)
+    warm = TspSA(dist_matrix, coordinates)
+    warm.solve(t0=100, tf=1, a=0.9, markov_length=2000, seed=0)
+    tour = warm.tour.copy()
+    energy = tour_length(dist_matrix, tour)
+    t = anneal(dist_matrix, tour, tour.copy(), energy, energy, np.random.default_rng(0), 100, 0.9, 1, 200,
+               use_jit=markov_chain is not None, stagnation_steps=3)[4]
+    assert t <= np.sqrt(100 * 1)
+
+
+def test_parallel_auto_temperatures():
+    """solve_parallel的t0/tf为"auto"时按估计的温度退火，不把字符串带入链状态"""
+    coordinates, dist_matrix = _random_instance(30, seed=2)
+    solver = TspSA(dist_matrix, coordinates)
+    solver.solve_parallel(n_chains=2, t0="auto", tf="auto", a=0.9, markov_length=200, seed=0)
+    assert sorted(solver.tour) == list(range(30))
+    assert solver.distance == tour_length(dist_matrix, solver.tour)
+    assert all(stats['temperature_steps'] > 0 for stats in solver.chain_stats)
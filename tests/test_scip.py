@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pyscipopt")
+
+from data import pairwise_distances
+from Tsp_SCIP import TspScip
+
+
+def test_mtz_without_incumbent_reports_no_solution():
+    """时间限制过短、还没有可行解时MTZ模型返回False而不是抛出异常"""
+    coordinates = np.random.default_rng(0).random((60, 2)) * 1000
+    dist_matrix = pairwise_distances(coordinates[:, None, :], coordinates[None, :, :])
+    solver = TspScip(dist_matrix, 60)
+    assert solver.solve(time_limit=0.01, formulation="mtz", heuristics=False) is False
+    assert solver.get_results()['tour'] is None
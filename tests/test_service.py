@@ -0,0 +1,88 @@
+import asyncio
+
+import numpy as np
+
+from service import TspService
+
+
+def _coordinates(n, seed=0):
+    return np.random.default_rng(seed).random((n, 2)) * 1000
+
+
+async def _events(svc, job_id):
+    return [event async for event in svc.stream(job_id)]
+
+
+def test_cancel_immediately_after_submit():
+    """提交后立即取消：任务尚未开始运行，作业仍应结束为cancelled且事件流正常结束"""
+    async def main():
+        svc = TspService(max_workers=1)
+        job_id = await svc.submit(_coordinates(20), 'lk', time_limit=5)
+        assert svc.cancel(job_id)
+        events = await asyncio.wait_for(_events(svc, job_id), 5)
+        status = await asyncio.wait_for(svc.result(job_id), 5)
+        assert [event['type'] for event in events] == ['queued', 'cancelled']
+        assert status['state'] == 'cancelled'
+        assert not svc.cancel(job_id)
+        await svc.close()
+    asyncio.run(main())
+
+
+def test_cancel_queued_job_keeps_queue_running():
+    """排队中的作业被取消后，后续作业照常运行"""
+    async def main():
+        svc = TspService(max_workers=1)
+        first = await svc.submit(_coordinates(30), 'lk', time_limit=1, seed=0)
+        second = await svc.submit(_coordinates(30), 'lk', time_limit=1, seed=0)
+        third = await svc.submit(_coordinates(30, seed=1), 'lk', time_limit=1, seed=0)
+        await asyncio.sleep(0.1)
+        assert svc.cancel(second)
+        results = await asyncio.wait_for(asyncio.gather(*(svc.result(j) for j in (first, second, third))), 60)
+        assert [r['state'] for r in results] == ['done', 'cancelled', 'done']
+        assert sorted(results[2]['result']['tour']) == list(range(30))
+        await svc.close()
+    asyncio.run(main())
+
+
+def test_cancel_running_job_returns_incumbent():
+    """运行中的作业被取消时求解器停止并返回当前最好解"""
+    async def main():
+        svc = TspService(max_workers=1, grace=60)
+        job_id = await svc.submit(_coordinates(200), 'lk', time_limit=60, seed=0)
+        async for event in svc.stream(job_id):
+            if event['type'] == 'incumbent':
+                break
+        assert svc.cancel(job_id)
+        status = await asyncio.wait_for(svc.result(job_id), 120)
+        assert status['state'] == 'cancelled'
+        assert sorted(status['result']['tour']) == list(range(200))
+        assert status['elapsed'] < 120
+        await svc.close()
+    asyncio.run(main())
+
+
+def test_deadline_expires_queued_job():
+    """排队时间超过deadline的作业不再运行"""
+    async def main():
+        svc = TspService(max_workers=1)
+        first = await svc.submit(_coordinates(30), 'lk', time_limit=1, seed=0)
+        second = await svc.submit(_coordinates(30), 'lk', time_limit=1, deadline=0.2, seed=0)
+        results = await asyncio.wait_for(asyncio.gather(svc.result(first), svc.result(second)), 60)
+        assert [r['state'] for r in results] == ['done', 'expired']
+        assert results[1]['result'] is None
+        await svc.close()
+    asyncio.run(main())
+
+
+def test_time_limit_streams_incumbents_and_finishes():
+    """求解器在时限内推送改进的最好解，结束时返回不差于最后一个incumbent的结果"""
+    async def main():
+        svc = TspService(max_workers=1, grace=5)
+        job_id = await svc.submit(_coordinates(200), 'sa', time_limit=1, seed=0)
+        events = await asyncio.wait_for(_events(svc, job_id), 60)
+        incumbents = [event['distance'] for event in events if event['type'] == 'incumbent']
+        assert events[-1]['type'] == 'done'
+        assert incumbents and incumbents == sorted(incumbents, reverse=True)
+        assert events[-1]['result']['distance'] <= incumbents[-1] + 1e-6
+        await svc.close()
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+import numpy as np
+
+from tour import ArrayTour, build_positions, between, exchange_segments, move_2opt, reverse, reverse_shorter
+
+
+def _edges(tour):
+    """回路的无向边集合"""
+    return {frozenset(e) for e in zip(tour, np.roll(tour, -1))}
+
+
+def _assert_positions(tour, pos):
+    assert np.array_equal(pos, build_positions(tour))
+
+
+def test_reverse_wraps_around():
+    """跨越数组末尾的片段反转后位置索引保持一致"""
+    tour = np.arange(8, dtype=np.int64)
+    pos = build_positions(tour)
+    reverse(tour, pos, 6, 1)
+    assert list(tour) == [7, 6, 2, 3, 4, 5, 1, 0]
+    _assert_positions(tour, pos)
+
+
+def test_reverse_shorter_gives_same_cycle():
+    """较短一侧的反转与直接反转得到相同的无向回路"""
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        n = int(rng.integers(3, 20))
+        i, j = (int(x) for x in rng.integers(0, n, 2))
+        direct = np.arange(n, dtype=np.int64)
+        reverse(direct, build_positions(direct), i, j)
+        tour = np.arange(n, dtype=np.int64)
+        pos = build_positions(tour)
+        reverse_shorter(tour, pos, i, j)
+        assert _edges(tour) == _edges(direct)
+        _assert_positions(tour, pos)
+
+
+def test_exchange_segments():
+    tour = np.arange(8, dtype=np.int64)
+    pos = build_positions(tour)
+    exchange_segments(tour, pos, 0, 3, 6)
+    assert list(tour) == [0, 3, 4, 5, 6, 1, 2, 7]
+    _assert_positions(tour, pos)
+
+
+def test_move_2opt_and_inverse():
+    """2-opt移动替换两条边，按(a, c, b, d)再移动一次恢复原回路"""
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        tour = rng.permutation(12).astype(np.int64)
+        pos = build_positions(tour)
+        original = _edges(tour)
+        i, j = sorted(int(x) for x in rng.choice(12, 2, replace=False))
+        if j - i < 2 or (i == 0 and j == 11):
+            continue
+        a, b, c, d = tour[i], tour[i + 1], tour[j], tour[(j + 1) % 12]
+        move_2opt(tour, pos, a, b, c, d)
+        _assert_positions(tour, pos)
+        assert _edges(tour) == original - {frozenset((a, b)), frozenset((c, d))} | {frozenset((a, c)), frozenset((b, d))}
+        move_2opt(tour, pos, a, c, b, d)
+        _assert_positions(tour, pos)
+        assert _edges(tour) == original
+
+
+def test_array_tour_queries():
+    tour = ArrayTour([3, 0, 4, 1, 2])
+    assert len(tour) == 5
+    assert tour.position(4) == 2
+    assert (tour.succ(2), tour.pred(3)) == (3, 2)
+    assert tour.between(0, 1, 2) and not tour.between(0, 3, 2)
+    # 区间跨越末尾
+    assert tour.between(1, 3, 0) and not tour.between(1, 4, 0)
+    tour.reverse(1, 3)
+    assert _edges(tour.to_array()) == _edges([3, 1, 4, 0, 2])
+    _assert_positions(tour.tour, tour.pos)
+    dist_matrix = np.abs(np.subtract.outer(np.arange(5.0), np.arange(5.0)))
+    assert tour.length(dist_matrix) == sum(dist_matrix[a, b] for a, b in zip(tour.tour, np.roll(tour.tour, -1)))
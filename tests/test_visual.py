@@ -0,0 +1,17 @@
+from progress import ProgressTrace
+from visual import plot_time_to_target
+
+
+def _trace(points):
+    trace = ProgressTrace(min_interval=0)
+    trace.records = [(t, incumbent, None, None, None, None) for t, incumbent in points]
+    return trace
+
+
+def test_time_to_target_plot(tmp_path):
+    """未达到目标的运行计入分母，图像直接保存为文件"""
+    runs = [[_trace([(0.1, 120), (0.5, 95)]), _trace([(0.2, 99)]), _trace([(0.3, 110)])],
+            [_trace([(1.0, 130)])]]
+    path = tmp_path / "ttt.png"
+    plot_time_to_target(runs, ["A", "B"], target=100, save_path=str(path))
+    assert path.stat().st_size > 0
@@ -0,0 +1,132 @@
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def build_positions(tour):
+    """生成位置索引：pos[c]为城市c在tour中的位置"""
+    pos = np.empty(tour.shape[0], dtype=np.int64)
+    for i in range(tour.shape[0]):
+        pos[tour[i]] = i
+    return pos
+
+
+def succ(tour, pos, city):
+    """城市city在回路中的后继"""
+    return tour[(pos[city] + 1) % tour.shape[0]]
+
+
+def pred(tour, pos, city):
+    """城市city在回路中的前驱"""
+    return tour[(pos[city] - 1) % tour.shape[0]]
+
+
+def between(tour, pos, a, b, c):
+    """沿正方向从a出发，是否在到达c之前（含端点）经过b"""
+    n = tour.shape[0]
+    return (pos[b] - pos[a]) % n <= (pos[c] - pos[a]) % n
+
+
+def reverse(tour, pos, i, j):
+    """原地反转从位置i到位置j（沿正方向，可跨越末尾）的片段，同时维护位置索引"""
+    n = tour.shape[0]
+    length = (j - i) % n + 1
+    for _ in range(length // 2):
+        ci, cj = tour[i], tour[j]
+        tour[i], tour[j] = cj, ci
+        pos[cj], pos[ci] = i, j
+        i = (i + 1) % n
+        j = (j - 1) % n
+
+
+def reverse_shorter(tour, pos, i, j):
+    """反转位置i到j的片段或其补集中较短的一侧，两者得到的无向回路相同，代价不超过n/2"""
+    n = tour.shape[0]
+    length = (j - i) % n + 1
+    if 2 * length > n:
+        reverse(tour, pos, (j + 1) % n, (i - 1) % n)
+    else:
+        reverse(tour, pos, i, j)
+
+
+def swap(tour, pos, i, j):
+    """交换位置i和j上的城市"""
+    ci, cj = tour[i], tour[j]
+    tour[i], tour[j] = cj, ci
+    pos[cj], pos[ci] = i, j
+
+
+def exchange_segments(tour, pos, i, j, k):
+    """原地交换相邻片段tour[i+1:j]与tour[j:k+1]（i < j < k），通过三次反转实现，不分配新数组"""
+    if j == i + 1:
+        return
+    reverse(tour, pos, i + 1, j - 1)
+    reverse(tour, pos, j, k)
+    reverse(tour, pos, i + 1, k)
+
+
+def move_2opt(tour, pos, t1, t2, t3, t4):
+    """删除边(t1, t2)、(t3, t4)并连接(t1, t3)、(t2, t4)，要求t2、t4分别在t1、t3的同一侧"""
+    if succ(tour, pos, t1) == t2:
+        reverse_shorter(tour, pos, pos[t2], pos[t3])
+    else:
+        reverse_shorter(tour, pos, pos[t1], pos[t4])
+
+
+if HAS_NUMBA:
+    build_positions = njit(cache=True)(build_positions)
+    succ = njit(cache=True)(succ)
+    pred = njit(cache=True)(pred)
+    between = njit(cache=True)(between)
+    reverse = njit(cache=True)(reverse)
+    reverse_shorter = njit(cache=True)(reverse_shorter)
+    swap = njit(cache=True)(swap)
+    exchange_segments = njit(cache=True)(exchange_segments)
+    move_2opt = njit(cache=True)(move_2opt)
+
+
+class ArrayTour:
+    """数组+位置索引表示的回路：按位置和按城市的查询均为O(1)，反转只处理较短的一侧"""
+
+    def __init__(self, tour):
+        self.tour = np.array(tour, dtype=np.int64)
+        self.pos = build_positions(self.tour)
+
+    def __len__(self):
+        return self.tour.shape[0]
+
+    def position(self, city):
+        """城市所在位置"""
+        return int(self.pos[city])
+
+    def succ(self, city):
+        """后继城市"""
+        return int(succ(self.tour, self.pos, city))
+
+    def pred(self, city):
+        """前驱城市"""
+        return int(pred(self.tour, self.pos, city))
+
+    def between(self, a, b, c):
+        """沿正方向从a到c是否经过b"""
+        return bool(between(self.tour, self.pos, a, b, c))
+
+    def reverse(self, i, j):
+        """反转位置i到j的片段（或等价地反转其补集）"""
+        reverse_shorter(self.tour, self.pos, i, j)
+
+    def move_2opt(self, t1, t2, t3, t4):
+        """2-opt移动：删除(t1, t2)、(t3, t4)，连接(t1, t3)、(t2, t4)"""
+        move_2opt(self.tour, self.pos, t1, t2, t3, t4)
+
+    def length(self, dist_matrix):
+        """回路长度"""
+        return float(np.sum(dist_matrix[self.tour, np.roll(self.tour, -1)]))
+
+    def to_array(self):
+        """返回城市访问顺序的副本"""
+        return self.tour.copy()
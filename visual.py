@@ -1,48 +1,80 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import rcParams
+from matplotlib.figure import Figure
 
 # 设置中文字体
 rcParams['font.sans-serif'] = ['microsoft yahei']
 
 
-class TSPVisualizer:
-    def __init__(self, coordinates):
-        self.coordinates = coordinates
+def _figure(save_path, nrows, ncols, figsize):
+    """创建图像：保存到文件时直接使用Figure对象，不经过pyplot和交互式后端"""
+    if save_path is None:
+        return plt.subplots(nrows, ncols, figsize=figsize)
+    fig = Figure(figsize=figsize)
+    axes = fig.subplots(nrows, ncols)
+    return fig, axes
 
-    def plot_single_solution(self, tour, distance, title, ax=None):
-        """绘制单个TSP解"""
-        if ax is None:
-            fig, ax = plt.subplots(figsize=(8, 6))
 
-        # 绘制城市点
-        ax.scatter(self.coordinates[:, 0], self.coordinates[:, 1], c='red', s=50, marker='o')
-
-        # 绘制路径
-        n = len(tour)
-        for i in range(n - 1):
-            city1 = tour[i]
-            city2 = tour[i + 1]
-            ax.plot([self.coordinates[city1, 0], self.coordinates[city2, 0]],
-                    [self.coordinates[city1, 1], self.coordinates[city2, 1]], 'b-')
+def _finish(fig, save_path):
+    """保存图像到文件（格式由扩展名决定，如.png/.svg），未指定路径时显示窗口"""
+    fig.tight_layout()
+    if save_path is None:
+        plt.show()
+    else:
+        fig.savefig(save_path)
 
-        # 绘制从最后一个城市回到第一个城市的路径
-        ax.plot([self.coordinates[tour[-1], 0], self.coordinates[tour[0], 0]],
-                [self.coordinates[tour[-1], 1], self.coordinates[tour[0], 1]], 'b-')
 
-        ax.set_title(f'{title} (距离: {distance:.2f})')
+class TSPVisualizer:
+    def __init__(self, coordinates, max_points=20000):
+        self.coordinates = coordinates
+        # 超过该城市数时按回路顺序等间隔抽样绘制
+        self.max_points = max_points
+
+    def _tour_points(self, tour):
+        """返回闭合回路的坐标序列，城市过多时沿回路抽样"""
+        tour = np.asarray(tour)
+        step = max(1, int(np.ceil(len(tour) / self.max_points)))
+        closed = np.append(tour[::step], tour[0])
+        return self.coordinates[closed]
+
+    def _city_points(self):
+        """城市坐标，城市过多时等间隔抽样"""
+        step = max(1, int(np.ceil(len(self.coordinates) / self.max_points)))
+        return self.coordinates[::step]
+
+    def _draw(self, ax, tour, title):
+        """在ax上把城市画成散点、把回路画成一条闭合折线"""
+        cities = self._city_points()
+        marker_size = 50 if len(cities) <= 200 else max(1, 5000 / len(cities))
+        ax.scatter(cities[:, 0], cities[:, 1], c='red', s=marker_size, marker='o')
+        points = self._tour_points(tour)
+        ax.plot(points[:, 0], points[:, 1], 'b-', linewidth=1 if len(points) <= 1000 else 0.3)
+        ax.set_title(title)
         ax.set_xlabel('X坐标')
         ax.set_ylabel('Y坐标')
         ax.grid(True)
 
-        if ax is None:
-            plt.tight_layout()
-            plt.show()
+    def plot_single_solution(self, tour, distance, title, ax=None, save_path=None):
+        """绘制单个TSP解，save_path不为None时保存为图片而不显示"""
+        own_figure = ax is None
+        if own_figure:
+            fig, ax = _figure(save_path, 1, 1, (8, 6))
+
+        self._draw(ax, tour, f'{title} (距离: {distance:.2f})')
 
-    def plot_comparison(self, sa_tour, sa_distance, gurobi_tour, gurobi_distance, scip_tour=None, scip_distance=None):
+        if own_figure:
+            _finish(fig, save_path)
+
+    def plot_comparison(self, sa_tour, sa_distance, gurobi_tour, gurobi_distance, scip_tour=None, scip_distance=None,
+                        save_path=None):
         """比较并绘制两种或三种算法的解"""
         if scip_tour is None:
             # 两种算法比较
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 8))
+            fig, (ax1, ax2) = _figure(save_path, 1, 2, (16, 8))
 
             # 绘制模拟退火结果
             self.plot_single_solution(sa_tour, sa_distance, '模拟退火最优路径', ax1)
@@ -55,7 +87,7 @@ class TSPVisualizer:
                 ax2.set_title('Gurobi结果')
         else:
             # 三种算法比较
-            fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(20, 6))
+            fig, (ax1, ax2, ax3) = _figure(save_path, 1, 3, (20, 6))
 
             # 绘制模拟退火结果
             self.plot_single_solution(sa_tour, sa_distance, '模拟退火最优路径', ax1)
@@ -74,38 +106,93 @@ class TSPVisualizer:
                 ax3.text(0.5, 0.5, 'SCIP未能找到可行解', ha='center', va='center', transform=ax3.transAxes)
                 ax3.set_title('SCIP结果')
 
-        plt.tight_layout()
-        plt.show()
+        _finish(fig, save_path)
 
-    def plot_multiple_comparison(self, tours, distances, labels):
+    def plot_multiple_comparison(self, tours, distances, labels, save_path=None):
         """绘制多个算法的路径比较图"""
         n_algorithms = len(tours)
-        fig, axes = plt.subplots(1, n_algorithms, figsize=(5 * n_algorithms, 5))
+        fig, axes = _figure(save_path, 1, n_algorithms, (5 * n_algorithms, 5))
 
         if n_algorithms == 1:
             axes = [axes]
 
-        for i, (tour, distance, label) in enumerate(zip(tours, distances, labels)):
-            ax = axes[i]
-            # 绘制城市点
-            ax.scatter(self.coordinates[:, 0], self.coordinates[:, 1], c='red', s=50, marker='o')
-
-            # 绘制路径
-            n = len(tour)
-            for j in range(n - 1):
-                city1 = tour[j]
-                city2 = tour[j + 1]
-                ax.plot([self.coordinates[city1, 0], self.coordinates[city2, 0]],
-                        [self.coordinates[city1, 1], self.coordinates[city2, 1]], 'b-')
-
-            # 绘制从最后一个城市回到第一个城市的路径
-            ax.plot([self.coordinates[tour[-1], 0], self.coordinates[tour[0], 0]],
-                    [self.coordinates[tour[-1], 1], self.coordinates[tour[0], 1]], 'b-')
-
-            ax.set_title(f'{label}\n路径长度: {distance:.2f}')
-            ax.set_xlabel('X坐标')
-            ax.set_ylabel('Y坐标')
-            ax.grid(True)
-
-        plt.tight_layout()
-        plt.show()
\ No newline at end of file
+        for ax, tour, distance, label in zip(axes, tours, distances, labels):
+            self._draw(ax, tour, f'{label}\n路径长度: {distance:.2f}')
+
+        _finish(fig, save_path)
+
+    def save_solutions(self, tours, distances, titles, paths, workers=None):
+        """在多个进程中批量渲染并保存回路图片，坐标只在每个工作进程初始化时传递一次"""
+        jobs = list(zip(tours, distances, titles, paths))
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(self.coordinates, self.max_points)) as executor:
+            list(executor.map(_render_job, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count())))))
+
+
+def plot_convergence(traces, labels, target=None, save_path=None):
+    """绘制各求解器单次运行的收敛曲线（最好解和界随时间的变化），给定target时标出该次运行达到目标值的时间
+
+    比较多次运行的达到目标时间分布使用plot_time_to_target。
+    """
+    fig, ax = _figure(save_path, 1, 1, (8, 6))
+    for trace, label in zip(traces, labels):
+        records = [r for r in trace.records if r[1] is not None]
+        if not records:
+            continue
+        times = [r[0] for r in records]
+        line, = ax.step(times, [r[1] for r in records], where='post', label=f'{label} 最好解')
+        bounds = [(r[0], r[2]) for r in trace.records if r[2] is not None]
+        if bounds:
+            ax.step([b[0] for b in bounds], [b[1] for b in bounds], where='post', linestyle='--',
+                    color=line.get_color(), label=f'{label} 下界')
+        if target is not None:
+            reached = trace.time_to_target(target)
+            if reached is not None:
+                ax.axvline(reached, color=line.get_color(), linestyle=':')
+    if target is not None:
+        ax.axhline(target, color='gray', linestyle=':', label='目标值')
+    ax.set_xlabel('时间(秒)')
+    ax.set_ylabel('路径长度')
+    ax.set_title('求解收敛曲线')
+    ax.grid(True)
+    ax.legend()
+    _finish(fig, save_path)
+
+
+def plot_time_to_target(runs, labels, target, save_path=None):
+    """绘制达到目标时间（TTT）图：各求解器多次运行（不同种子）的time_to_target经验分布函数
+
+    runs中每项为同一求解器多次运行的ProgressTrace列表。第i快的运行画在纵坐标(i - 0.5)/k处，
+    其中k为运行次数。未达到目标的运行也计入k，所以曲线停在该求解器的成功率上。
+    """
+    fig, ax = _figure(save_path, 1, 1, (8, 6))
+    for traces, label in zip(runs, labels):
+        times = sorted(t for t in (trace.time_to_target(target) for trace in traces) if t is not None)
+        if not times:
+            continue
+        probabilities = (np.arange(1, len(times) + 1) - 0.5) / len(traces)
+        ax.plot(times, probabilities, marker='o', linestyle='none',
+                label=f'{label} ({len(times)}/{len(traces)}次达到)')
+    ax.set_xlabel('达到目标值的时间(秒)')
+    ax.set_ylabel('累积概率')
+    ax.set_ylim(0, 1)
+    ax.set_title(f'达到目标时间分布 (目标值 {target:g})')
+    ax.grid(True)
+    ax.legend()
+    _finish(fig, save_path)
+
+
+# 批量渲染时每个工作进程持有的可视化对象
+_worker_visualizer = None
+
+
+def _init_worker(coordinates, max_points):
+    """工作进程初始化"""
+    global _worker_visualizer
+    _worker_visualizer = TSPVisualizer(coordinates, max_points)
+
+
+def _render_job(job):
+    """渲染并保存单张回路图"""
+    tour, distance, title, path = job
+    _worker_visualizer.plot_single_solution(tour, distance, title, save_path=path)